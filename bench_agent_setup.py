@@ -0,0 +1,111 @@
+"""
+Microbenchmark the per-turn setup of the medical interview agent.
+
+    python bench_agent_setup.py
+    python bench_agent_setup.py --iterations 5000
+
+Before: what every turn did before the agent was memoized. It read the
+prompt file, wrapped the reviewer with as_tool() (building its tool schema)
+and constructed a new Agent.
+After: `medical_interview_agent(model)` (an lru_cache hit), and resolving
+the instructions through load_prompt_md, which only stats the prompt file
+unless it changed.
+
+Both paths end with the system prompt the run would send, so prompt
+loading is part of the cost either way.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+
+# Keep traces of benchmark runs out of Braintrust.
+os.environ.setdefault("TRACING_MODE", "off")
+
+from openai.types.shared import Reasoning
+from agents import Agent, ModelSettings, RunContextWrapper
+
+from medical_agents.medical_interview_agent import (
+    INTERVIEW_PROMPT_PATH,
+    medical_interview_agent,
+)
+from medical_agents.review_interview_agent import review_interview_agent
+from medical_agents.tools import (
+    update_intake_form,
+    edit_symptom,
+    edit_medication,
+    edit_allergy,
+    report_completion,
+)
+
+
+MODEL = "gpt-5-mini"
+# Prompt paths are relative to medical_agents/, as in load_prompt_md
+PROMPT_BASE_DIR = Path(__file__).resolve().parent / "medical_agents"
+
+
+def build_uncached(model: str) -> Agent:
+    """The interview agent as it was built on every turn before memoization."""
+    prompt = (PROMPT_BASE_DIR / INTERVIEW_PROMPT_PATH).read_text(encoding="utf-8-sig")
+    return Agent(
+        name="Medical Interview Orchestrate Agent",
+        instructions=prompt,
+        model=model,
+        model_settings=ModelSettings(
+            reasoning=Reasoning(effort="medium"), verbosity="low"
+        ),
+        tools=[
+            update_intake_form,
+            edit_symptom,
+            edit_medication,
+            edit_allergy,
+            review_interview_agent.as_tool(
+                tool_name="review_interview_agent",
+                tool_description="""
+                    問診内容に不十分な部分が無いか確認するレビュアーエージェントです。
+                    問診票の内容を受け渡してレビューを依頼して下さい。
+                    結果として合否と総括コメントを受け取れます。
+                """,
+            ),
+            report_completion,
+        ],
+    )
+
+
+async def time_setup(build, iterations: int) -> list[float]:
+    context = RunContextWrapper(context=None)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        agent = build(MODEL)
+        await agent.get_system_prompt(context)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--iterations", type=int, default=1000, help="Turns per path (default: 1000)"
+    )
+    args = parser.parse_args()
+
+    medical_interview_agent(MODEL)  # warm the cache, as the first turn would
+    for name, build in (("before", build_uncached), ("after", medical_interview_agent)):
+        timings = await time_setup(build, args.iterations)
+        print(
+            f"{name:<7} p50 {percentile(timings, 50) * 1e6:9.1f} µs  "
+            f"p95 {percentile(timings, 95) * 1e6:9.1f} µs  "
+            f"mean {sum(timings) / len(timings) * 1e6:9.1f} µs"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
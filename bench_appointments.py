@@ -0,0 +1,119 @@
+"""
+Benchmark the appointment listing: the old ORM path against the projection path.
+
+    python bench_appointments.py                          # 10k and 100k rows
+    python bench_appointments.py --rows 50000 --repeat 5
+
+Old: load Appointment entities joined to Patient (patients lazy-loaded as in
+the original handler), build validated ReadAppointmentSchema objects, then
+jsonable_encoder + json.dumps as FastAPI does for a response_model.
+New: `appointments_page_query` (only the listed columns), model_construct
+and model_dump_json, as `GET /api/appointments` does now.
+
+Both paths run on the sync engine so only the query shape and serialization
+differ. When the database has fewer dated appointments than the largest
+--rows, it is topped up with inject_dummy_data.seed() first.
+"""
+
+import argparse
+import json
+import math
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import desc, func, select
+from sqlalchemy.orm import Session
+
+from db import engine
+from inject_dummy_data import seed
+from main import appointments_page_query
+from models import Appointment
+from schemas import ReadAppointmentPage, ReadAppointmentSchema
+
+
+# inject_dummy_data.seed() makes 1-4 appointments per patient, 100 patients per unit
+APPOINTMENTS_PER_SCALE = 250
+
+
+def old_path(session: Session, rows: int) -> tuple[float, float]:
+    started = time.perf_counter()
+    appointments = session.scalars(
+        select(Appointment)
+        .join(Appointment.patient)
+        .where(Appointment.date.is_not(None))
+        .order_by(desc(Appointment.date))
+        .limit(rows)
+    ).all()
+    items = [
+        ReadAppointmentSchema(
+            id=appointment.id,
+            status=appointment.status,
+            first_name=appointment.patient.first_name,
+            last_name=appointment.patient.last_name,
+            age=appointment.patient.age,
+            gender=appointment.patient.gender,
+            date=appointment.date,
+        )
+        for appointment in appointments
+    ]
+    fetched = time.perf_counter()
+    json.dumps(jsonable_encoder(items)).encode()
+    return fetched - started, time.perf_counter() - fetched
+
+
+def new_path(session: Session, rows: int) -> tuple[float, float]:
+    started = time.perf_counter()
+    result = session.execute(appointments_page_query(rows)).all()[:rows]
+    fetched = time.perf_counter()
+    ReadAppointmentPage.model_construct(
+        items=[ReadAppointmentSchema.model_construct(**row._mapping) for row in result],
+        next_cursor=None,
+    ).model_dump_json()
+    return fetched - started, time.perf_counter() - fetched
+
+
+def ensure_rows(rows: int, seed_value: int) -> None:
+    with engine.connect() as conn:
+        count = conn.scalar(
+            select(func.count()).where(Appointment.date.is_not(None))
+        )
+    if count < rows:
+        scale = math.ceil((rows - count) / APPOINTMENTS_PER_SCALE * 1.1)
+        print(f"{count} appointments; seeding scale {scale}")
+        seed(scale=scale, seed=seed_value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000],
+        help="Result sizes to time (default: 10000 100000)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per path; the best is kept"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for topping up")
+    args = parser.parse_args()
+
+    ensure_rows(max(args.rows), args.seed)
+
+    print(f"{'rows':>8} {'path':<4} {'fetch':>10} {'serialize':>10} {'rows/s':>10}")
+    for rows in args.rows:
+        for name, path in (("old", old_path), ("new", new_path)):
+            timings = []
+            for _ in range(args.repeat):
+                # Fresh session each run so the identity map does not carry over
+                with Session(engine) as session:
+                    timings.append(path(session, rows))
+            fetch, serialize = min(timings, key=sum)
+            print(
+                f"{rows:>8} {name:<4} {fetch * 1000:>8.1f}ms {serialize * 1000:>8.1f}ms "
+                f"{rows / (fetch + serialize):>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Benchmark the intake tools under concurrent writers on one medical interview.
+
+    python inject_dummy_data.py --scale 1            # needs an appointment to attach to
+    python bench_intake_tools.py --writers 20 --ops 50
+    python bench_intake_tools.py --interview-id 42 --writers 50
+
+Each writer stands in for one chat turn's agent: it has its own request
+context (intake snapshot and row version) and calls update_intake_form,
+edit_symptom and edit_medication in a random mix, back to back, through the
+tools' real invoke path. All writers target the same interview, so
+update_intake_form's compare-and-swap keeps losing races.
+
+Reported per tool: calls, p50/p95/p99 latency and failures (ok False or a
+tool error). Overall: writes per second, fields returned as conflicts, and
+retries (snapshot reloads after a lost compare-and-swap).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+
+# Keep traces of benchmark runs out of Braintrust.
+os.environ.setdefault("TRACING_MODE", "off")
+
+from agents.tool_context import ToolContext
+from sqlalchemy import select
+
+import medical_agents.tools as tools
+from db import AsyncSessionLocal, async_engine
+from inject_dummy_data import DURATIONS, MEDICATIONS, ONSETS, SYMPTOMS, VISIT_REASONS
+from models import Appointment, MedicalInterview, InterviewStatus
+from medical_agents.tools import (
+    MyRequestContext,
+    edit_medication,
+    edit_symptom,
+    load_intake_snapshot,
+    update_intake_form,
+)
+
+
+class BenchAgentContext:
+    """The parts of MyAgentContext the intake tools use."""
+
+    def __init__(self, request_context: MyRequestContext):
+        self.request_context = request_context
+
+    async def stream(self, event) -> None:
+        pass
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def random_call(rng: random.Random) -> tuple:
+    kind = rng.random()
+    if kind < 0.5:
+        patch = {
+            "visit_reason": rng.choice(VISIT_REASONS),
+            "duration": rng.choice(DURATIONS + [None]),
+            "severity_0_10": rng.choice([None, rng.randint(0, 10)]),
+            "notes": None,
+        }
+        return update_intake_form, {"patch": patch}
+    if kind < 0.8:
+        name, detail = rng.choice(SYMPTOMS)
+        symptom = {
+            "name": name,
+            "detail": detail,
+            "onset": rng.choice(ONSETS),
+            "severity_0_10": rng.randint(1, 10),
+        }
+        action = rng.choice(["append", "update", "remove"])
+        return edit_symptom, {"action": action, "symptom": symptom}
+    name, dose, frequency = rng.choice(MEDICATIONS)
+    medication = {"name": name, "dose": dose, "frequency": frequency, "notes": None}
+    action = rng.choice(["append", "update", "remove"])
+    return edit_medication, {"action": action, "medication": medication}
+
+
+class Results:
+    def __init__(self):
+        self.latency: defaultdict[str, list[float]] = defaultdict(list)
+        self.failures: Counter = Counter()
+        self.conflicts = 0
+        self.retries = 0
+
+
+async def run_writer(
+    interview_id: int, ops: int, rng: random.Random, results: Results
+) -> None:
+    request_context = MyRequestContext(interview_id=interview_id)
+    # The unpatched function: this first load is not a retry
+    await load_intake_snapshot(request_context)
+    agent_context = BenchAgentContext(request_context)
+    for _ in range(ops):
+        tool, arguments = random_call(rng)
+        payload = json.dumps(arguments, ensure_ascii=False)
+        tool_context = ToolContext(
+            context=agent_context,
+            tool_name=tool.name,
+            tool_call_id=f"call_{uuid.uuid4().hex}",
+            tool_arguments=payload,
+        )
+        started = time.perf_counter()
+        result = await tool.on_invoke_tool(tool_context, payload)
+        results.latency[tool.name].append(time.perf_counter() - started)
+        if not isinstance(result, dict) or not result.get("ok"):
+            results.failures[tool.name] += 1
+        elif "conflicts" in result:
+            results.conflicts += len(result["conflicts"])
+
+
+def count_retries(results: Results) -> None:
+    # Writers load their own snapshot up front, so every reload from inside
+    # the tools is update_intake_form recovering from a lost compare-and-swap.
+    async def counting_load_intake_snapshot(request_context) -> bool:
+        results.retries += 1
+        return await load_intake_snapshot(request_context)
+
+    tools.load_intake_snapshot = counting_load_intake_snapshot
+
+
+async def create_interview() -> int:
+    async with AsyncSessionLocal() as db:
+        appointment_id = await db.scalar(
+            select(Appointment.id).order_by(Appointment.id).limit(1)
+        )
+        if appointment_id is None:
+            raise SystemExit("No appointments; seed some with inject_dummy_data.py")
+        interview = MedicalInterview(
+            status=InterviewStatus.DRAFT,
+            appointment_id=appointment_id,
+            initial_consult="頭痛があります。",
+            intake={"initial_patient_message": "頭痛があります。"},
+            created_at=datetime.now(),
+        )
+        db.add(interview)
+        await db.commit()
+        return interview.id
+
+
+def report(results: Results, elapsed: float) -> None:
+    def ms(seconds: float) -> str:
+        return f"{seconds * 1000:8.1f} ms"
+
+    calls = sum(len(values) for values in results.latency.values())
+    for name, values in sorted(results.latency.items()):
+        print(
+            f"{name:<20} {len(values):>5} calls  p50 {ms(percentile(values, 50))}  "
+            f"p95 {ms(percentile(values, 95))}  p99 {ms(percentile(values, 99))}  "
+            f"{results.failures[name]} failed"
+        )
+    print(f"writes/s             {calls / elapsed:.1f}")
+    print(f"conflicts            {results.conflicts} fields")
+    print(f"retries              {results.retries}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--writers", type=int, default=20, help="Concurrent writers")
+    parser.add_argument("--ops", type=int, default=50, help="Tool calls per writer")
+    parser.add_argument(
+        "--interview-id", type=int, help="Interview to write to (default: a new one)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    interview_id = args.interview_id or await create_interview()
+    results = Results()
+    rng = random.Random(args.seed)
+    count_retries(results)
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_writer(interview_id, args.ops, random.Random(rng.random()), results)
+            for _ in range(args.writers)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    print(f"interview            {interview_id} ({args.writers} writers)")
+    report(results, elapsed)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,568 @@
+"""
+Load test for POST /chatkit with N concurrent simulated patients.
+
+    python inject_dummy_data.py --scale 10          # needs appointments to attach to
+    python chatkit_load_test.py --sessions 50 --turns 4 --tokens-per-second 40
+
+    # many concurrent streams on a small pool (the chat path holds no
+    # connection while the model runs); exits non-zero on any error or if
+    # more connections were checked out than the pool allows
+    DB_POOL_SIZE=10 DB_MAX_OVERFLOW=0 python chatkit_load_test.py --sessions 200 --check
+
+The app is served in-process by uvicorn and driven over real HTTP with httpx.
+Every model call (interview agent, reviewer, history summary) goes to a
+deterministic local FakeModel instead of OpenAI. It streams a canned reply at
+--tokens-per-second. Each turn it first calls update_intake_form; on the last
+turn it then calls review_interview_agent and report_completion. Agents
+with a structured output type (the reviewer) get a valid JSON reply. The
+database, ChatKit store and tools are the real ones.
+
+Reported: TTFB and inter-event latency of the SSE stream, p50/p95/p99 turn
+time, SQL statements per turn, peak pool connections checked out, RSS
+growth per session, and tool calls that returned an error (counted as
+errors, since the fake model never retries). tests/test_chat_pool.py runs
+the 200-session / 10-connection case against a PostgreSQL container.
+"""
+
+import argparse
+import ast
+import asyncio
+import itertools
+import json
+import os
+import resource
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+# Keep traces of fake runs out of Braintrust.
+os.environ.setdefault("TRACING_MODE", "off")
+
+import httpx
+import uvicorn
+from sqlalchemy import event, select
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseContentPartAddedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputItemAddedEvent,
+    ResponseOutputItemDoneEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseTextDoneEvent,
+)
+from agents import ModelResponse, Usage
+from agents.models.interface import Model
+from agents.models.multi_provider import MultiProvider
+
+import db
+from config import settings
+from db import AsyncSessionLocal, get_pool_status
+from models import Appointment
+from medical_agents.review_interview_agent import ReviewInterviewOutput
+
+
+FINAL_MESSAGE = "以上です。"
+REPLY_TEXT = (
+    "ありがとうございます。症状について確認しました。"
+    "ほかに気になる症状やお薬、アレルギーはありますか？"
+)
+REVIEW_OUTPUT = ReviewInterviewOutput(
+    review_judge=True, overall_comment="問診票に不足はありません。"
+)
+# Prefix of agents.tool.default_tool_error_function's message
+TOOL_ERROR_PREFIX = "An error occurred while running the tool"
+
+
+def _message_text(item) -> str:
+    content = item.get("content")
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") for part in content or [])
+
+
+def _tool_failed(output) -> bool:
+    """True for a tool exception, or a tool result dict with ok False."""
+    if not isinstance(output, str):
+        return False
+    if output.startswith(TOOL_ERROR_PREFIX):
+        return True
+    # Dict results are stringified with str(), i.e. Python literal syntax
+    try:
+        result = ast.literal_eval(output)
+    except (ValueError, SyntaxError):
+        return False
+    return isinstance(result, dict) and result.get("ok") is False
+
+
+class FakeModel(Model):
+    """
+    Deterministic stand-in for the Responses API.
+
+    The tool calls to make are decided from the input: the function outputs
+    since the last user message say how far into the turn's plan we are.
+    """
+
+    def __init__(self, tokens_per_second: float, first_token_delay: float):
+        self.token_interval = 1 / tokens_per_second
+        self.first_token_delay = first_token_delay
+        self.tool_errors = 0
+
+    def _check_last_output(self, input) -> None:
+        # Each tool result is the last input item of exactly one model call
+        if isinstance(input, str) or not input:
+            return
+        last = input[-1]
+        if last.get("type") == "function_call_output" and _tool_failed(
+            last.get("output")
+        ):
+            self.tool_errors += 1
+
+    def _reply_text(self, output_schema) -> str:
+        if output_schema is None or output_schema.is_plain_text():
+            return REPLY_TEXT
+        return REVIEW_OUTPUT.model_dump_json()
+
+    def _plan(self, input, tools) -> list[tuple[str, dict]]:
+        if isinstance(input, str):
+            input = [{"role": "user", "content": input}]
+        items = input
+        last_user = max(
+            (i for i, item in enumerate(items) if item.get("role") == "user"),
+            default=-1,
+        )
+        user_text = _message_text(items[last_user]) if last_user >= 0 else ""
+        done = sum(
+            1
+            for item in items[last_user + 1 :]
+            if item.get("type") == "function_call_output"
+        )
+
+        plan = [
+            (
+                "update_intake_form",
+                {
+                    "patch": {
+                        "visit_reason": user_text[:40],
+                        "duration": None,
+                        "severity_0_10": 3,
+                        "notes": None,
+                    }
+                },
+            )
+        ]
+        if FINAL_MESSAGE in user_text:
+            plan += [
+                (
+                    "review_interview_agent",
+                    {"input": "問診票のレビューをお願いします。"},
+                ),
+                ("report_completion", {}),
+            ]
+        tool_names = {getattr(tool, "name", None) for tool in tools}
+        return [call for call in plan if call[0] in tool_names][done:]
+
+    def _response(self, output) -> Response:
+        return Response(
+            id=f"resp_{uuid.uuid4().hex}",
+            created_at=time.time(),
+            model="fake",
+            object="response",
+            output=output,
+            parallel_tool_calls=False,
+            tool_choice="auto",
+            tools=[],
+        )
+
+    def _tool_call(self, name: str, arguments: dict) -> ResponseFunctionToolCall:
+        return ResponseFunctionToolCall(
+            id=f"fc_{uuid.uuid4().hex}",
+            call_id=f"call_{uuid.uuid4().hex}",
+            name=name,
+            arguments=json.dumps(arguments, ensure_ascii=False),
+            type="function_call",
+            status="completed",
+        )
+
+    def _message(self, text: str) -> ResponseOutputMessage:
+        return ResponseOutputMessage(
+            id=f"msg_{uuid.uuid4().hex}",
+            content=[ResponseOutputText(text=text, annotations=[], type="output_text")],
+            role="assistant",
+            status="completed",
+            type="message",
+        )
+
+    async def get_response(
+        self,
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        *args,
+        **kwargs,
+    ) -> ModelResponse:
+        await asyncio.sleep(self.first_token_delay)
+        self._check_last_output(input)
+        plan = self._plan(input, tools)
+        if plan:
+            output = [self._tool_call(*plan[0])]
+        else:
+            output = [self._message(self._reply_text(output_schema))]
+        return ModelResponse(output=output, usage=Usage(), response_id=None)
+
+    async def stream_response(
+        self,
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        *args,
+        **kwargs,
+    ):
+        await asyncio.sleep(self.first_token_delay)
+        self._check_last_output(input)
+        sequence = itertools.count()
+        plan = self._plan(input, tools)
+        if plan:
+            call = self._tool_call(*plan[0])
+            yield ResponseOutputItemDoneEvent(
+                item=call,
+                output_index=0,
+                sequence_number=next(sequence),
+                type="response.output_item.done",
+            )
+            yield ResponseCompletedEvent(
+                response=self._response([call]),
+                sequence_number=next(sequence),
+                type="response.completed",
+            )
+            return
+
+        text = self._reply_text(output_schema)
+        message = self._message(text)
+        yield ResponseOutputItemAddedEvent(
+            item=message.model_copy(update={"content": [], "status": "in_progress"}),
+            output_index=0,
+            sequence_number=next(sequence),
+            type="response.output_item.added",
+        )
+        yield ResponseContentPartAddedEvent(
+            content_index=0,
+            item_id=message.id,
+            output_index=0,
+            part=ResponseOutputText(text="", annotations=[], type="output_text"),
+            sequence_number=next(sequence),
+            type="response.content_part.added",
+        )
+        # One character per "token" keeps the rate easy to reason about.
+        for token in text:
+            yield ResponseTextDeltaEvent(
+                content_index=0,
+                delta=token,
+                item_id=message.id,
+                logprobs=[],
+                output_index=0,
+                sequence_number=next(sequence),
+                type="response.output_text.delta",
+            )
+            await asyncio.sleep(self.token_interval)
+        yield ResponseTextDoneEvent(
+            content_index=0,
+            item_id=message.id,
+            logprobs=[],
+            output_index=0,
+            text=text,
+            sequence_number=next(sequence),
+            type="response.output_text.done",
+        )
+        yield ResponseOutputItemDoneEvent(
+            item=message,
+            output_index=0,
+            sequence_number=next(sequence),
+            type="response.output_item.done",
+        )
+        yield ResponseCompletedEvent(
+            response=self._response([message]),
+            sequence_number=next(sequence),
+            type="response.completed",
+        )
+
+
+class Metrics:
+    def __init__(self):
+        self.ttfb: list[float] = []
+        self.inter_event: list[float] = []
+        self.turn_time: list[float] = []
+        self.turns = 0
+        self.errors = 0
+        self.tool_errors = 0
+        self.statements = 0
+        self.max_checked_out = 0
+        self.max_checkout_wait_ms = 0.0
+        # Response streams open at the same time
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.elapsed = 0.0
+        self.rss_growth_mb = 0.0
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+@contextmanager
+def watch_database(metrics: Metrics):
+    """Count SQL statements and track the peak of pool connections checked out."""
+    # Looked up at call time so a test can swap in its own engine
+    engine = db.async_engine
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        metrics.statements += 1
+
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.max_checked_out = max(
+            metrics.max_checked_out, get_pool_status()["checked_out"]
+        )
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    event.listen(engine.sync_engine.pool, "checkout", checkout)
+    try:
+        yield
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+        event.remove(engine.sync_engine.pool, "checkout", checkout)
+
+
+async def create_interviews(client: httpx.AsyncClient, count: int) -> list[int]:
+    async with AsyncSessionLocal() as session:
+        appointment_ids = list(
+            await session.scalars(
+                select(Appointment.id).order_by(Appointment.id).limit(count)
+            )
+        )
+    if len(appointment_ids) < count:
+        raise SystemExit(
+            f"Need {count} appointments, found {len(appointment_ids)}; "
+            "seed more with inject_dummy_data.py"
+        )
+    res = await client.post(
+        "/api/medical_interviews/bulk",
+        json={
+            "appointment_ids": appointment_ids,
+            "initial_consult": "頭痛があります。",
+        },
+    )
+    res.raise_for_status()
+    return [result["medical_interview_id"] for result in res.json()]
+
+
+async def run_turn(
+    client: httpx.AsyncClient, interview_id: int, payload: dict, metrics: Metrics
+) -> str | None:
+    thread_id = None
+    started = time.perf_counter()
+    last_event = None
+    async with client.stream(
+        "POST",
+        "/chatkit",
+        content=json.dumps(payload, ensure_ascii=False),
+        headers={
+            "x-interview-id": str(interview_id),
+            "content-type": "application/json",
+        },
+    ) as res:
+        res.raise_for_status()
+        metrics.in_flight += 1
+        metrics.max_in_flight = max(metrics.max_in_flight, metrics.in_flight)
+        try:
+            async for line in res.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                now = time.perf_counter()
+                if last_event is None:
+                    metrics.ttfb.append(now - started)
+                else:
+                    metrics.inter_event.append(now - last_event)
+                last_event = now
+                data = json.loads(line[len("data:") :])
+                if data.get("type") == "thread.created":
+                    thread_id = data["thread"]["id"]
+                elif data.get("type") == "error":
+                    metrics.errors += 1
+        finally:
+            metrics.in_flight -= 1
+    metrics.turn_time.append(time.perf_counter() - started)
+    metrics.turns += 1
+    return thread_id
+
+
+async def run_session(
+    client: httpx.AsyncClient, interview_id: int, turns: int, metrics: Metrics
+) -> None:
+    thread_id = None
+    for turn in range(turns):
+        if turn == turns - 1:
+            text = FINAL_MESSAGE
+        else:
+            text = f"{turn + 1}日前から頭痛があります。"
+        user_input = {
+            "content": [{"type": "input_text", "text": text}],
+            "attachments": [],
+            "inference_options": {},
+        }
+        if thread_id is None:
+            payload = {"type": "threads.create", "params": {"input": user_input}}
+        else:
+            payload = {
+                "type": "threads.add_user_message",
+                "params": {"thread_id": thread_id, "input": user_input},
+            }
+        try:
+            thread_id = (
+                await run_turn(client, interview_id, payload, metrics) or thread_id
+            )
+        except httpx.HTTPError:
+            metrics.errors += 1
+            return
+
+
+def rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def report(metrics: Metrics, sessions: int) -> None:
+    def ms(seconds: float) -> str:
+        return f"{seconds * 1000:8.1f} ms"
+
+    print(f"sessions           {sessions}")
+    print(f"turns              {metrics.turns} ({metrics.errors} errors)")
+    print(f"tool errors        {metrics.tool_errors}")
+    print(f"elapsed            {metrics.elapsed:.1f}s")
+    print(f"throughput         {metrics.turns / metrics.elapsed:.2f} turns/s")
+    for name, values in (
+        ("ttfb", metrics.ttfb),
+        ("inter-event", metrics.inter_event),
+        ("turn time", metrics.turn_time),
+    ):
+        print(
+            f"{name:<18} p50 {ms(percentile(values, 50))}  "
+            f"p95 {ms(percentile(values, 95))}  p99 {ms(percentile(values, 99))}"
+        )
+    print(f"SQL per turn       {metrics.statements / max(metrics.turns, 1):.1f}")
+    print(f"streams in flight  {metrics.max_in_flight} max")
+    print(
+        f"pool checked out   {metrics.max_checked_out} max "
+        f"(checkout wait {metrics.max_checkout_wait_ms:.1f} ms max)"
+    )
+    print(
+        f"RSS per session    {metrics.rss_growth_mb / sessions * 1024:.1f} KiB "
+        "(peak growth)"
+    )
+
+
+async def run_load_test(
+    sessions: int,
+    turns: int = 4,
+    tokens_per_second: float = 50,
+    first_token_delay: float = 0.3,
+    port: int = 8765,
+) -> Metrics:
+    """Serve the app in-process with the fake model and run `sessions` patients at once."""
+    fake_model = FakeModel(tokens_per_second, first_token_delay)
+    original_get_model = MultiProvider.get_model
+    MultiProvider.get_model = lambda self, model_name: fake_model
+
+    from main import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, port=port, log_level="warning", lifespan="off")
+    )
+    server_task = asyncio.create_task(server.serve())
+    metrics = Metrics()
+    try:
+        while not server.started:
+            await asyncio.sleep(0.05)
+
+        limits = httpx.Limits(max_connections=sessions + 1)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=None
+        ) as client:
+            interview_ids = await create_interviews(client, sessions)
+            with watch_database(metrics):
+                rss_before = rss_mb()
+                started = time.perf_counter()
+                await asyncio.gather(
+                    *(
+                        run_session(client, interview_id, turns, metrics)
+                        for interview_id in interview_ids
+                    )
+                )
+                metrics.elapsed = time.perf_counter() - started
+                metrics.rss_growth_mb = rss_mb() - rss_before
+    finally:
+        server.should_exit = True
+        await server_task
+        MultiProvider.get_model = original_get_model
+
+    metrics.max_checkout_wait_ms = get_pool_status()["max_wait_ms"]
+    metrics.tool_errors = fake_model.tool_errors
+    metrics.errors += fake_model.tool_errors
+    return metrics
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--sessions", type=int, default=20, help="Concurrent patients"
+    )
+    parser.add_argument("--turns", type=int, default=4, help="User turns per session")
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument(
+        "--first-token-delay",
+        type=float,
+        default=0.3,
+        help="Seconds before each model output",
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit 1 on any error or if the pool went over DB_POOL_SIZE + DB_MAX_OVERFLOW",
+    )
+    args = parser.parse_args()
+
+    metrics = await run_load_test(
+        args.sessions,
+        args.turns,
+        args.tokens_per_second,
+        args.first_token_delay,
+        args.port,
+    )
+    report(metrics, args.sessions)
+
+    if args.check:
+        pool_limit = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        failures = []
+        if metrics.errors:
+            failures.append(f"{metrics.errors} errors")
+        if metrics.max_checked_out > pool_limit:
+            failures.append(
+                f"{metrics.max_checked_out} connections checked out (limit {pool_limit})"
+            )
+        if failures:
+            print("FAILED: " + ", ".join(failures), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 from pydantic import AnyUrl
 
@@ -11,6 +13,38 @@ class Settings(BaseSettings):
     WORKFLOW_ID: str
     BRAINTRUST_API_KEY: str
 
+    # Database connection pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+
+    # Per-process conversation context cache: max threads, and how long a
+    # closed (completed) thread is kept before it is evicted
+    CHAT_STORE_MAX_THREADS: int = 1000
+    CHAT_STORE_CLOSED_THREAD_TTL_SECONDS: int = 600
+
+    # Chat history sent to the model each turn (estimated tokens)
+    CHAT_HISTORY_TOKEN_BUDGET: int = 8000
+    CHAT_HISTORY_SUMMARY_ENABLED: bool = True
+    CHAT_SUMMARY_MODEL: str = "gpt-5-mini"
+
+    # /chatkit response stream: keepalive interval and per-connection event buffer
+    CHAT_STREAM_HEARTBEAT_SECONDS: float = 15
+    CHAT_STREAM_BUFFER_EVENTS: int = 64
+
+    # Agent tracing (Braintrust)
+    TRACING_MODE: Literal["off", "sampled", "full"] = "full"
+    TRACING_SAMPLE_RATE: float = 0.1
+
+    # In-process cache of medical interview reads (ETag / If-None-Match).
+    # Writes in this process invalidate immediately; the TTL bounds staleness
+    # from writes made by other processes.
+    INTERVIEW_CACHE_MAX_ENTRIES: int = 1000
+    INTERVIEW_CACHE_TTL_SECONDS: float = 5
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
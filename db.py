@@ -1,19 +1,102 @@
+import time
+from threading import Lock
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from config import settings
 
-engine = create_engine(str(settings.DATABASE_URL), echo=True)
+
+class PoolStats:
+    """Counters for connection checkouts, used to watch pool waits."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_checkout(self, wait_seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "avg_wait_ms": (
+                    self.total_wait_seconds / self.checkouts * 1000
+                    if self.checkouts
+                    else 0.0
+                ),
+                "max_wait_ms": self.max_wait_seconds * 1000,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_stats.record_checkout(time.perf_counter() - start)
+
+
+_pool_options = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+# Async engine used by the FastAPI handlers and agent tools (one pool per process).
+async_engine = create_async_engine(
+    make_url(str(settings.DATABASE_URL)).set(drivername="postgresql+asyncpg"),
+    echo=not settings.PRODUCTION,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    connect_args={
+        "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    },
+    **_pool_options,
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+# Sync engine for scripts (e.g. inject_dummy_data.py).
+engine = create_engine(
+    str(settings.DATABASE_URL),
+    echo=not settings.PRODUCTION,
+    connect_args={"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"},
+    **_pool_options,
+)
+SessionLocal = sessionmaker(bind=engine)
 
 
 def get_db_session():
-    return sessionmaker(bind=engine)()
+    return SessionLocal()
 
 
-def get_db():
-    engine = create_engine(str(settings.DATABASE_URL), echo=not settings.PRODUCTION)
-    db = sessionmaker(bind=engine)()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def get_pool_status() -> dict:
+    pool = async_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **pool_stats.snapshot(),
+    }
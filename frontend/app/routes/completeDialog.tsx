@@ -17,7 +17,7 @@ import { ScrollArea } from "~/components/ui/scroll-area"
 type CompleteDialogType = {
     open: boolean;
     setOpen: (value: boolean) => void;
-    interviewForm: string;
+    interviewForm: Record<string, unknown> | null;
 }
 
 
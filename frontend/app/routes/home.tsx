@@ -1,4 +1,5 @@
 import type { Route } from "../+types/root";
+import { useEffect, useState } from "react";
 import { Link, useFetcher } from "react-router";
 
 import { ClipboardPlus, RefreshCcw } from 'lucide-react';
@@ -8,8 +9,8 @@ import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "~
 
 export async function clientLoader({ request, params }: Route.ClientLoaderArgs) {
     const res = await fetch("/api/appointments");
-    const appointments = await res.json();
-    return { appointments }
+    const { items: appointments, next_cursor: nextCursor } = await res.json();
+    return { appointments, nextCursor }
 }
 
 export async function clientAction({ request, params }: Route.ClientActionArgs) {
@@ -23,6 +24,28 @@ export async function clientAction({ request, params }: Route.ClientActionArgs)
 
 export default function Home({ loaderData, params }: Route.ComponentProps) {
     const fetcher = useFetcher();
+    const [appointments, setAppointments] = useState(loaderData.appointments);
+    const [nextCursor, setNextCursor] = useState<string | null>(loaderData.nextCursor);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    // Reset to the first page whenever the loader re-runs (e.g. after "Reset for Demo")
+    useEffect(() => {
+        setAppointments(loaderData.appointments);
+        setNextCursor(loaderData.nextCursor);
+    }, [loaderData]);
+
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const res = await fetch(`/api/appointments?cursor=${encodeURIComponent(nextCursor)}`);
+            const { items, next_cursor } = await res.json();
+            setAppointments((prev) => [...prev, ...items]);
+            setNextCursor(next_cursor);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
 
     return (
         <main className="w-full h-30 text-center">
@@ -49,7 +72,7 @@ export default function Home({ loaderData, params }: Route.ComponentProps) {
                             </TableRow>
                         </TableHeader>
                         <TableBody>
-                            {loaderData.appointments.map(
+                            {appointments.map(
                                 (appointment) =>
                                     <TableRow key={appointment.id} className={
                                         appointment.status === "Medical interview required"
@@ -104,6 +127,14 @@ export default function Home({ loaderData, params }: Route.ComponentProps) {
                             )}
                         </TableBody>
                     </Table>
+                    {nextCursor &&
+                        <div className="text-center">
+                            <Button variant="outline" size="sm" className="cursor-pointer"
+                                disabled={loadingMore} onClick={loadMore}>
+                                {loadingMore ? "Loading..." : "Load more"}
+                            </Button>
+                        </div>
+                    }
                 </div>
             </div>
         </main>
@@ -6,7 +6,7 @@ import { useNavigate } from "react-router";
 type IntakeChatProps = {
     interviewId: string;
     initialMessage?: string;
-    responseEndHandler: (event: void) => void;
+    responseEndHandler?: (event: void) => void;
     effectHandler?: (event: {
         name: string;
         data?: Record<string, unknown>;
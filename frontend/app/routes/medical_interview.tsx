@@ -13,16 +13,30 @@ export async function clientLoader({ request, params }: Route.ClientLoaderArgs)
 
 export default function MedicalInterview({ loaderData, params }: Route.ComponentProps) {
     const interviewId = params.interviewId ?? ""
-    const [interviewForm, setInterviewForm] = useState("");
+    const [interviewForm, setInterviewForm] = useState<Record<string, unknown> | null>(null);
     const [flash, setFlash] = useState(false);
     const [completed, setCompleted] = useState(false);
 
-    const responseEndHandler = async () => {
+    const loadInterviewForm = async () => {
         const res = await fetch(`/api/medical_interviews/${interviewId}`);
         const data = await res.json();
         setInterviewForm(data.intake);
     }
 
+    // 問診票の変更をSSEで受け取る (Receive intake changes over SSE)
+    useEffect(() => {
+        const events = new EventSource(`/api/medical_interviews/${interviewId}/events`);
+        events.addEventListener("intake", (event) => {
+            const { changes } = JSON.parse((event as MessageEvent).data);
+            setInterviewForm((prev) => ({ ...(prev ?? {}), ...changes }));
+        });
+        // The server dropped events for this client (it fell behind): reload
+        events.addEventListener("resync", () => loadInterviewForm());
+        // Load the whole form on every (re)connect, so nothing is missed in between
+        events.onopen = () => loadInterviewForm();
+        return () => events.close();
+    }, [interviewId]);
+
     const effectHander = ({ name, data }: { name: string, data?: Record<string, unknown> }) => {
         if (name === "interview_completed") {
             // setCompleted(true);
@@ -30,10 +44,7 @@ export default function MedicalInterview({ loaderData, params }: Route.Component
     }
 
     useEffect(() => {
-        if (!interviewForm) {
-            responseEndHandler();
-            return
-        };
+        if (!interviewForm) return;
         setFlash(true);
         const t = window.setTimeout(() => setFlash(false), 3000);
         return () => window.clearTimeout(t);
@@ -46,7 +57,6 @@ export default function MedicalInterview({ loaderData, params }: Route.Component
                 <IntakeChat
                     interviewId={interviewId}
                     initialMessage={loaderData.initialMessage}
-                    responseEndHandler={responseEndHandler}
                     effectHandler={effectHander}
                 />
             </div>
@@ -1,28 +1,258 @@
-from db import get_db_session
-from models import Patient, Appointment
+"""
+Seed the database with synthetic patients, appointments and medical interviews.
 
+    python inject_dummy_data.py                      # 100 patients (scale 1)
+    python inject_dummy_data.py --scale 10000        # ~1M patients, ~2.5M appointments
+    python inject_dummy_data.py --scale 100 --seed 7 --truncate
 
-with get_db_session() as db:
-    db_patient = Patient(
-        first_name="patient",
-        last_name="1",
-        age=31,
-        gender="male",
+Rows are generated deterministically from --seed and inserted in batches of
+--batch-size with multi-row INSERT ... RETURNING, one transaction per batch,
+so memory use does not grow with the scale factor. Intakes are built with
+IntakeForm / Symptom / Medication / Allergy so they match what the chat
+tools write.
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from db import engine
+from models import Patient, Appointment, MedicalInterview, Genter, InterviewStatus
+from medical_agents.intake_schemas import IntakeForm, Symptom, Medication, Allergy
+
+
+PATIENTS_PER_SCALE = 100
+
+FIRST_NAMES = ["太郎", "花子", "一郎", "美咲", "健", "陽菜", "翔", "結衣", "大輔", "さくら"]
+LAST_NAMES = ["佐藤", "鈴木", "高橋", "田中", "伊藤", "渡辺", "山本", "中村", "小林", "加藤"]
+
+APPOINTMENT_STATUSES = ["Medical interview required", "closed"]
+
+VISIT_REASONS = ["発熱と咳", "頭痛", "腹痛", "喉の痛み", "めまい", "腰痛", "発疹", "息苦しさ"]
+DURATIONS = ["今日の朝から", "昨日から", "2日前から", "1週間前から", "1か月ほど前から"]
+SYMPTOMS = [
+    ("発熱", "38度台"),
+    ("咳", "痰がからむ"),
+    ("頭痛", "こめかみがズキズキする"),
+    ("腹痛", "みぞおちのあたり"),
+    ("喉の痛み", "飲み込むと痛い"),
+    ("倦怠感", None),
+    ("吐き気", "食後に強い"),
+    ("発疹", "腕と背中"),
+]
+ONSETS = ["今日の朝", "昨日の夜", "2日前", "3日前", "1週間前"]
+MEDICATIONS = [
+    ("ロキソプロフェン", "60mg", "頓服"),
+    ("アムロジピン", "5mg", "1日1回"),
+    ("メトホルミン", "500mg", "1日2回"),
+    ("ロスバスタチン", "2.5mg", "1日1回"),
+    ("レバミピド", "100mg", "1日3回"),
+]
+ALLERGIES = [
+    ("ペニシリン", "発疹"),
+    ("卵", "じんましん"),
+    ("そば", "息苦しさ"),
+    ("造影剤", "吐き気"),
+    ("花粉", "くしゃみ"),
+]
+ALLERGY_SEVERITIES = ["mild", "moderate", "severe", "unknown"]
+
+
+def make_patient(rng: random.Random) -> dict:
+    return {
+        "first_name": rng.choice(FIRST_NAMES),
+        "last_name": rng.choice(LAST_NAMES),
+        "age": rng.randint(0, 95),
+        "gender": rng.choice(list(Genter)),
+    }
+
+
+def make_appointment(rng: random.Random, patient_id: int, start: datetime) -> dict:
+    return {
+        "status": rng.choice(APPOINTMENT_STATUSES),
+        "patient_id": patient_id,
+        "date": start + timedelta(minutes=30 * rng.randrange(2 * 24 * 365)),
+    }
+
+
+def make_intake(rng: random.Random, patient: dict, created_at: datetime) -> dict:
+    visit_reason = rng.choice(VISIT_REASONS)
+    symptoms = [
+        Symptom(
+            name=name,
+            detail=detail,
+            onset=rng.choice(ONSETS),
+            severity_0_10=rng.randint(1, 10),
+        )
+        for name, detail in rng.sample(SYMPTOMS, rng.randint(1, 3))
+    ]
+    medications = [
+        Medication(name=name, dose=dose, frequency=frequency)
+        for name, dose, frequency in rng.sample(MEDICATIONS, rng.randint(0, 2))
+    ]
+    allergies = [
+        Allergy(
+            allergen=allergen,
+            reaction=reaction,
+            severity=rng.choice(ALLERGY_SEVERITIES),
+        )
+        for allergen, reaction in rng.sample(ALLERGIES, rng.randint(0, 2))
+    ]
+    return IntakeForm(
+        updated_at=created_at,
+        full_name=f"{patient['last_name']} {patient['first_name']}",
+        age_years=patient["age"],
+        sex=patient["gender"].value,
+        initial_patient_message=f"{visit_reason}があります。",
+        visit_reason=visit_reason,
+        duration=rng.choice(DURATIONS),
+        severity_0_10=rng.randint(1, 10),
+        symptoms=symptoms,
+        medications=medications,
+        allergies=allergies,
+    ).model_dump(mode="json")
+
+
+def make_interview(
+    rng: random.Random,
+    appointment_id: int,
+    appointment: dict,
+    patient: dict,
+    completed_ratio: float,
+) -> dict:
+    created_at = appointment["date"] - timedelta(hours=rng.randint(1, 72))
+    intake = make_intake(rng, patient, created_at)
+    completed = rng.random() < completed_ratio
+    return {
+        "status": InterviewStatus.COMPLETED if completed else InterviewStatus.DRAFT,
+        "appointment_id": appointment_id,
+        "initial_consult": intake["initial_patient_message"],
+        "intake": intake,
+        "created_at": created_at,
+    }
+
+
+def insert_returning_ids(conn, table, rows: list[dict]) -> list[int]:
+    if not rows:
+        return []
+    result = conn.execute(
+        insert(table).returning(table.id, sort_by_parameter_order=True), rows
     )
-    db.add(db_patient)
-    db.commit()
-    db.refresh(db_patient)
-
-    db_appointment_1 = Appointment(
-        status="closed",
-        patient_id=db_patient.id,
-        date="2025-11-02 11:30:00",
+    return list(result.scalars())
+
+
+def seed(
+    scale: float = 1,
+    seed: int = 0,
+    batch_size: int = 5000,
+    interview_ratio: float = 0.6,
+    completed_ratio: float = 0.9,
+    bind=None,
+) -> None:
+    """Insert the synthetic data through `bind` (default: the app's sync engine)."""
+    bind = bind if bind is not None else engine
+    rng = random.Random(seed)
+    total_patients = max(1, round(scale * PATIENTS_PER_SCALE))
+    start = datetime(2025, 1, 1, 9, 0)
+    counts = {"patients": 0, "appointments": 0, "medical_interviews": 0}
+    started = time.perf_counter()
+
+    for offset in range(0, total_patients, batch_size):
+        patients = [
+            make_patient(rng)
+            for _ in range(min(batch_size, total_patients - offset))
+        ]
+        # 1バッチ = 1トランザクション (One transaction per batch)
+        with bind.begin() as conn:
+            patient_ids = insert_returning_ids(conn, Patient, patients)
+
+            appointments = []
+            appointment_patients = []
+            for patient_id, patient in zip(patient_ids, patients):
+                for _ in range(rng.randint(1, 4)):
+                    appointments.append(make_appointment(rng, patient_id, start))
+                    appointment_patients.append(patient)
+            appointment_ids = insert_returning_ids(conn, Appointment, appointments)
+
+            interviews = [
+                make_interview(
+                    rng, appointment_id, appointment, patient, completed_ratio
+                )
+                for appointment_id, appointment, patient in zip(
+                    appointment_ids, appointments, appointment_patients
+                )
+                if rng.random() < interview_ratio
+            ]
+            insert_returning_ids(conn, MedicalInterview, interviews)
+
+        counts["patients"] += len(patients)
+        counts["appointments"] += len(appointments)
+        counts["medical_interviews"] += len(interviews)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{counts['patients']}/{total_patients} patients, "
+            f"{counts['appointments']} appointments, "
+            f"{counts['medical_interviews']} interviews ({elapsed:.1f}s)"
+        )
+
+
+def truncate() -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "TRUNCATE medical_interviews, appointments, patients "
+                "RESTART IDENTITY CASCADE"
+            )
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1,
+        help=f"Scale factor; {PATIENTS_PER_SCALE} patients per unit (default: 1)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=5000,
+        help="Patients per INSERT batch / transaction (default: 5000)",
+    )
+    parser.add_argument(
+        "--interview-ratio",
+        type=float,
+        default=0.6,
+        help="Share of appointments that get a medical interview (default: 0.6)",
+    )
+    parser.add_argument(
+        "--completed-ratio",
+        type=float,
+        default=0.9,
+        help="Share of interviews that are completed; the rest are drafts (default: 0.9)",
     )
-    db_appointment_2 = Appointment(
-        status="Medical interview required",
-        patient_id=db_patient.id,
-        date="2025-12-19 18:30:00",
+    parser.add_argument(
+        "--truncate",
+        action="store_true",
+        help="Empty patients, appointments and medical_interviews first",
     )
-    db.add(db_appointment_1)
-    db.add(db_appointment_2)
-    db.commit()
+    args = parser.parse_args()
+
+    if args.truncate:
+        truncate()
+    seed(
+        args.scale,
+        args.seed,
+        args.batch_size,
+        args.interview_ratio,
+        args.completed_ratio,
+    )
+
+
+if __name__ == "__main__":
+    main()
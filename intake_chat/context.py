@@ -0,0 +1,224 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from agents import TResponseInputItem
+from chatkit.agents import ThreadItemConverter
+from chatkit.store import NotFoundError, Store
+from chatkit.types import AssistantMessageItem, ThreadItem, UserMessageItem
+
+from config import settings
+from intake_chat.metrics import CHAT_CONTEXT_CACHE_EVICTIONS, CHAT_CONTEXT_CACHE_LOOKUPS
+
+
+PAGE_SIZE = 30
+
+
+def estimate_tokens(value) -> int:
+    """
+    Rough token count without a tokenizer: ~4 ASCII characters per token,
+    and about one token per non-ASCII (e.g. Japanese) character.
+    """
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii + 1
+
+
+def item_text(item: ThreadItem) -> str | None:
+    """Plain "role: text" line for user/assistant messages, None for other items."""
+    if isinstance(item, UserMessageItem):
+        role = "user"
+    elif isinstance(item, AssistantMessageItem):
+        role = "assistant"
+    else:
+        return None
+    text = "".join(getattr(part, "text", "") for part in item.content).strip()
+    return f"{role}: {text}" if text else None
+
+
+@dataclass
+class ConvertedItem:
+    item: ThreadItem
+    inputs: list[TResponseInputItem]
+    tokens: int
+
+
+@dataclass
+class ThreadContext:
+    items: list[ConvertedItem] = field(default_factory=list)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @property
+    def tokens(self) -> int:
+        return sum(converted.tokens for converted in self.items)
+
+
+class ConversationContextCache:
+    """
+    Per-thread cache of thread items already converted to agent input.
+
+    Each turn only the items added since the previous turn are loaded from the
+    store and converted. When a thread's items are edited or deleted, the store
+    calls `invalidate` and the next turn rebuilds that thread from scratch.
+    Changes made through another process are not notified; they surface as
+    the cached last item no longer existing, which also triggers a rebuild.
+    The history window is the newest items that fit in `token_budget`.
+
+    Memory is bounded: threads are evicted least-recently-used beyond
+    `max_threads`, and closed threads (`mark_closed`, e.g. after
+    report_completion) `closed_thread_ttl_seconds` after closing. Lookups and
+    evictions are counted on /metrics.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = settings.CHAT_HISTORY_TOKEN_BUDGET,
+        max_threads: int = settings.CHAT_STORE_MAX_THREADS,
+        closed_thread_ttl_seconds: float = settings.CHAT_STORE_CLOSED_THREAD_TTL_SECONDS,
+        converter: ThreadItemConverter | None = None,
+    ):
+        self.token_budget = token_budget
+        self.max_threads = max_threads
+        self.closed_thread_ttl_seconds = closed_thread_ttl_seconds
+        self.converter = converter or ThreadItemConverter()
+        self._threads: OrderedDict[str, ThreadContext] = OrderedDict()
+        # thread id -> time.monotonic() when it was closed, oldest first
+        self._closed_at: OrderedDict[str, float] = OrderedDict()
+
+    def invalidate(self, thread_id: str) -> None:
+        self._threads.pop(thread_id, None)
+        self._closed_at.pop(thread_id, None)
+
+    def mark_closed(self, thread_id: str) -> None:
+        """Start the closed-thread TTL; the thread is dropped once it expires."""
+        if thread_id in self._threads and thread_id not in self._closed_at:
+            self._closed_at[thread_id] = time.monotonic()
+        self._evict_expired()
+
+    def _evict_expired(self) -> None:
+        deadline = time.monotonic() - self.closed_thread_ttl_seconds
+        while self._closed_at:
+            thread_id, closed_at = next(iter(self._closed_at.items()))
+            if closed_at > deadline:
+                break
+            del self._closed_at[thread_id]
+            if self._threads.pop(thread_id, None) is not None:
+                CHAT_CONTEXT_CACHE_EVICTIONS.inc(reason="closed_ttl")
+
+    def _evict_lru(self) -> None:
+        while len(self._threads) > self.max_threads:
+            thread_id, _ = self._threads.popitem(last=False)
+            self._closed_at.pop(thread_id, None)
+            CHAT_CONTEXT_CACHE_EVICTIONS.inc(reason="lru")
+
+    def __len__(self) -> int:
+        return len(self._threads)
+
+    def window_start_id(self, thread_id: str) -> str | None:
+        """Id of the oldest item still sent verbatim for the thread."""
+        thread_context = self._threads.get(thread_id)
+        if thread_context is None or not thread_context.items:
+            return None
+        return thread_context.items[0].item.id
+
+    async def build(
+        self, store: Store, thread_id: str, context, reserved_tokens: int = 0
+    ) -> list[TResponseInputItem]:
+        """
+        Return the thread's recent history as agent input. `reserved_tokens`
+        (e.g. the rolling summary) are taken out of the budget first.
+        """
+        budget = self.token_budget - reserved_tokens
+        self._evict_expired()
+        thread_context = self._threads.get(thread_id)
+        if thread_context is None:
+            thread_context = ThreadContext()
+            self._threads[thread_id] = thread_context
+            self._evict_lru()
+        self._threads.move_to_end(thread_id)
+        CHAT_CONTEXT_CACHE_LOOKUPS.inc(result="hit" if thread_context.items else "miss")
+
+        async with thread_context.lock:
+            if thread_context.items:
+                try:
+                    await self._append_new_items(
+                        store, thread_id, thread_context, context
+                    )
+                except NotFoundError:
+                    # The cursor item was deleted or replaced elsewhere (e.g. by
+                    # another worker): the cached items are stale, rebuild.
+                    CHAT_CONTEXT_CACHE_EVICTIONS.inc(reason="stale")
+                    thread_context.items = []
+            if not thread_context.items:
+                await self._load_recent_items(
+                    store, thread_id, thread_context, budget, context
+                )
+
+            # Keep the newest items within the budget (always at least the last one).
+            while len(thread_context.items) > 1 and thread_context.tokens > budget:
+                thread_context.items.pop(0)
+
+            return await self._flatten(thread_context.items)
+
+    async def _load_recent_items(
+        self,
+        store: Store,
+        thread_id: str,
+        thread_context: ThreadContext,
+        budget: int,
+        context,
+    ) -> None:
+        newest_first: list[ConvertedItem] = []
+        tokens = 0
+        after = None
+        while tokens <= budget:
+            page = await store.load_thread_items(
+                thread_id, after=after, limit=PAGE_SIZE, order="desc", context=context
+            )
+            for item in page.data:
+                converted = await self._convert(item)
+                newest_first.append(converted)
+                tokens += converted.tokens
+                if tokens > budget:
+                    break
+            if not page.has_more:
+                break
+            after = page.after
+        thread_context.items = newest_first[::-1]
+
+    async def _append_new_items(
+        self, store: Store, thread_id: str, thread_context: ThreadContext, context
+    ) -> None:
+        after = thread_context.items[-1].item.id
+        while True:
+            page = await store.load_thread_items(
+                thread_id, after=after, limit=PAGE_SIZE, order="asc", context=context
+            )
+            for item in page.data:
+                thread_context.items.append(await self._convert(item))
+            if not page.has_more:
+                break
+            after = page.after
+
+    async def _convert(self, item: ThreadItem) -> ConvertedItem:
+        # Cached form is the "not last message" one; the last item is redone in _flatten.
+        if isinstance(item, UserMessageItem):
+            inputs = (
+                await self.converter.user_message_to_input(item, is_last_message=False)
+                or []
+            )
+            inputs = inputs if isinstance(inputs, list) else [inputs]
+        else:
+            inputs = await self.converter.to_agent_input(item)
+        return ConvertedItem(item=item, inputs=inputs, tokens=estimate_tokens(inputs))
+
+    async def _flatten(self, items: list[ConvertedItem]) -> list[TResponseInputItem]:
+        if not items:
+            return []
+        input_items = [
+            input_item for converted in items[:-1] for input_item in converted.inputs
+        ]
+        input_items.extend(await self.converter.to_agent_input(items[-1].item))
+        return input_items
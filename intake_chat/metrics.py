@@ -0,0 +1,169 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from agents import RunHooks
+
+
+# Upper bounds in seconds (Prometheus "le" buckets)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """
+    Prometheus-style latency histogram kept in process memory.
+
+    `observe` is a bisect plus a few integer increments, cheap enough to stay
+    on in production.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...],
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, seconds: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, seconds)] += 1
+        series[1] += seconds
+        series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for key, (counts, total, count) in sorted(self._series.items()):
+            labels = ",".join(
+                f'{name}="{value}"' for name, value in zip(self.label_names, key)
+            )
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                sep = "," if labels else ""
+                lines.append(
+                    f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}'
+                )
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class Counter:
+    """Prometheus-style monotonically increasing counter kept in process memory."""
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.label_names), 0)
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        for key, total in sorted(self._values.items()):
+            labels = ",".join(
+                f'{name}="{value}"' for name, value in zip(self.label_names, key)
+            )
+            lines.append(f"{self.name}{{{labels}}} {total}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list[Histogram | Counter] = []
+
+    def histogram(
+        self, name: str, documentation: str, label_names: tuple[str, ...]
+    ) -> Histogram:
+        histogram = Histogram(name, documentation, label_names)
+        self._metrics.append(histogram)
+        return histogram
+
+    def counter(
+        self, name: str, documentation: str, label_names: tuple[str, ...]
+    ) -> Counter:
+        counter = Counter(name, documentation, label_names)
+        self._metrics.append(counter)
+        return counter
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        return "\n".join(
+            line for metric in self._metrics for line in metric.render()
+        ) + "\n"
+
+
+registry = MetricsRegistry()
+
+CHAT_STAGE_SECONDS = registry.histogram(
+    "chat_stage_seconds", "Latency of each stage of a chat turn.", ("stage",)
+)
+CHAT_TOOL_SECONDS = registry.histogram(
+    "chat_tool_seconds", "Latency of each agent tool call.", ("tool",)
+)
+CHAT_CONTEXT_CACHE_LOOKUPS = registry.counter(
+    "chat_context_cache_lookups_total",
+    "Conversation context cache lookups per chat turn.",
+    ("result",),
+)
+CHAT_CONTEXT_CACHE_EVICTIONS = registry.counter(
+    "chat_context_cache_evictions_total",
+    "Threads dropped from the conversation context cache.",
+    ("reason",),
+)
+
+
+class ToolTimingHooks(RunHooks):
+    """Run hooks that record every tool call's duration by tool name."""
+
+    def __init__(self):
+        # (run context id, tool name) -> start times of calls still running
+        self._started: dict[tuple[int, str], list[float]] = {}
+
+    async def on_tool_start(self, context, agent, tool) -> None:
+        self._started.setdefault((id(context), tool.name), []).append(
+            time.perf_counter()
+        )
+
+    async def on_tool_end(self, context, agent, tool, result) -> None:
+        key = (id(context), tool.name)
+        started = self._started.get(key)
+        if not started:
+            return
+        seconds = time.perf_counter() - started.pop()
+        if not started:
+            del self._started[key]
+        CHAT_TOOL_SECONDS.observe(seconds, tool=tool.name)
+
+
+tool_timing_hooks = ToolTimingHooks()
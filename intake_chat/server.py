@@ -2,11 +2,12 @@ from typing import AsyncIterator
 from dotenv import load_dotenv
 from dataclasses import dataclass
 from datetime import datetime
+import time
 import uuid
 
 import truststore  # SSL証明書エラーの対応のため
 from openai.types.shared import Reasoning
-from agents import Agent, Runner, ModelSettings, set_trace_processors
+from agents import Agent, Runner, ModelSettings
 from chatkit.server import ChatKitServer
 from chatkit.types import (
     ThreadMetadata,
@@ -15,27 +16,37 @@ from chatkit.types import (
     ThreadStreamEvent,
 )
 from chatkit.agents import AgentContext, simple_to_agent_input, stream_agent_response
-from braintrust import init_logger
-from braintrust.wrappers.openai import BraintrustTracingProcessor
 
 from models import MedicalInterview
-from config import settings
 
+from config import settings
+from intake_chat.context import ConversationContextCache, estimate_tokens
+from intake_chat.metrics import CHAT_STAGE_SECONDS, tool_timing_hooks
+from intake_chat.summary import SUMMARY_KEY, HistorySummarizer
 from medical_agents.tools import MyRequestContext, MyAgentContext
 from medical_agents.medical_interview_agent import medical_interview_agent
+from medical_agents.intake_schemas import intake_to_prompt
 
 load_dotenv()
 truststore.inject_into_ssl()  # SSL証明書エラーの対応のため
 
 
 class MyChatKitServer(ChatKitServer[dict]):
+    def __init__(self, store, attachment_store=None):
+        super().__init__(store, attachment_store)
+        # 変換済みチャット履歴のキャッシュ (Cache of converted chat history per thread)
+        self.conversation_context = ConversationContextCache()
+        store.add_change_listener(self.conversation_context.invalidate)
+        store.add_close_listener(self.conversation_context.mark_closed)
+        self.history_summarizer = HistorySummarizer(self.conversation_context)
+
     async def respond(
         self,
         thread: ThreadMetadata,
         input_user_message: UserMessageItem | None,
         context: MyRequestContext,  # dictから型指定した独自クラスに変更
     ) -> AsyncIterator[ThreadStreamEvent]:
-        db = context.db
+        turn_started = time.perf_counter()
         interview_id = context.interview_id
 
         # 選択されたモデルの取得
@@ -43,8 +54,12 @@ class MyChatKitServer(ChatKitServer[dict]):
         model = options.model if options and options.model else "gpt-5-mini"
 
         # 問診票データの取得とHiddenContextへの格納
-        obj = db.get(MedicalInterview, interview_id)
-        interview_data = obj.intake
+        # 接続はこの読み込みの間だけ使う (Hold a connection only for this read)
+        with CHAT_STAGE_SECONDS.time(stage="load_interview"):
+            async with context.session_factory() as db:
+                obj = await db.get(MedicalInterview, interview_id)
+        context.intake, context.intake_version = obj.intake, obj.version
+        interview_data = intake_to_prompt(obj.intake)
         hidden_context = HiddenContextItem(
             id=f"hc_{uuid.uuid4().hex}",
             thread_id=thread.id,
@@ -52,35 +67,64 @@ class MyChatKitServer(ChatKitServer[dict]):
             content=f"<MEDICAL_INTERVIEW_FORM>\n{interview_data}\n</MEDICAL_INTERVIEW_FORM>",
         )
 
-        # Storeから直近のチャット履歴を取得
-        items_page = await self.store.load_thread_items(
-            thread.id,
-            after=None,
-            limit=30,
-            order="desc",
-            context=context,
-        )
-        items = list(reversed(items_page.data))
+        # 古い会話の要約 (Rolling summary of turns older than the history window)
+        context_items = [hidden_context]
+        summary = thread.metadata.get(SUMMARY_KEY)
+        if summary:
+            context_items.append(
+                HiddenContextItem(
+                    id=f"hc_{uuid.uuid4().hex}",
+                    thread_id=thread.id,
+                    created_at=datetime.now(),
+                    content=f"<CONVERSATION_SUMMARY>\n{summary}\n</CONVERSATION_SUMMARY>",
+                )
+            )
 
-        # チャット履歴と問診票データ(HiddenContext)を結合してAgent Inputを作成
-        input_items = await simple_to_agent_input([hidden_context, *items])
+        # 直近のチャット履歴を取得 (前回から増えた分だけStoreから読み込んで変換)
+        with CHAT_STAGE_SECONDS.time(stage="load_history"):
+            history_items = await self.conversation_context.build(
+                self.store,
+                thread.id,
+                context,
+                reserved_tokens=estimate_tokens(summary) if summary else 0,
+            )
 
-        # BraintrustにTracingを送信
-        set_trace_processors(
-            [
-                BraintrustTracingProcessor(
-                    init_logger("Capstone", api_key=settings.BRAINTRUST_API_KEY)
-                )
-            ]
-        )
+        # チャット履歴と問診票データ(HiddenContext)を結合してAgent Inputを作成
+        with CHAT_STAGE_SECONDS.time(stage="agent_input"):
+            input_items = [*await simple_to_agent_input(context_items), *history_items]
 
         # Stream the run through ChatKit events
         # 型指定するためにAgentContextから独自クラスに変更
-        agent_context = MyAgentContext(
-            thread=thread, store=self.store, request_context=context
-        )
-        result = Runner.run_streamed(
-            medical_interview_agent(model=model), input_items, context=agent_context
-        )
-        async for event in stream_agent_response(agent_context, result):
-            yield event
+        with CHAT_STAGE_SECONDS.time(stage="agent_setup"):
+            agent_context = MyAgentContext(
+                thread=thread, store=self.store, request_context=context
+            )
+            result = Runner.run_streamed(
+                medical_interview_agent(model=model),
+                input_items,
+                context=agent_context,
+                hooks=tool_timing_hooks,
+            )
+
+        # ツール毎の所要時間はhooksで記録 (Per-tool timings come from the run hooks)
+        run_started = time.perf_counter()
+        first_event = True
+        try:
+            async for event in stream_agent_response(agent_context, result):
+                if first_event:
+                    CHAT_STAGE_SECONDS.observe(
+                        time.perf_counter() - run_started, stage="first_event"
+                    )
+                    first_event = False
+                yield event
+        finally:
+            # クライアント切断などで中断された場合はモデル実行を止める
+            # (Stop the model run if the stream was abandoned, e.g. client disconnect)
+            if not result.is_complete:
+                result.cancel()
+        CHAT_STAGE_SECONDS.observe(time.perf_counter() - run_started, stage="run")
+        CHAT_STAGE_SECONDS.observe(time.perf_counter() - turn_started, stage="turn")
+
+        # 要約の更新はレスポンス後にバックグラウンドで実行
+        if settings.CHAT_HISTORY_SUMMARY_ENABLED:
+            self.history_summarizer.schedule_refresh(self.store, thread.id, context)
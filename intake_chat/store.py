@@ -1,101 +1,184 @@
-from collections import defaultdict
+from typing import Callable
+
+from pydantic import TypeAdapter
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from chatkit.store import NotFoundError, Store
 from chatkit.types import Attachment, Page, ThreadItem, ThreadMetadata
 
+from db import AsyncSessionLocal
+from models import ChatThread, ChatThreadItem
+
+
+class ChangeNotifyingStore(Store[dict]):
+    """
+    Store base that tells listeners (e.g. the conversation context cache)
+    when a thread's existing items are replaced or removed, and when a
+    thread is saved as closed.
+    """
 
-class MyChatKitStore(Store[dict]):
     def __init__(self):
-        self.threads: dict[str, ThreadMetadata] = {}
-        self.items: dict[str, list[ThreadItem]] = defaultdict(list)
+        self._change_listeners: list[Callable[[str], None]] = []
+        self._close_listeners: list[Callable[[str], None]] = []
+
+    def add_change_listener(self, listener: Callable[[str], None]) -> None:
+        self._change_listeners.append(listener)
+
+    def add_close_listener(self, listener: Callable[[str], None]) -> None:
+        self._close_listeners.append(listener)
+
+    def _notify_change(self, thread_id: str) -> None:
+        for listener in self._change_listeners:
+            listener(thread_id)
+
+    def _notify_close(self, thread: ThreadMetadata) -> None:
+        if thread.status.type != "closed":
+            return
+        for listener in self._close_listeners:
+            listener(thread.id)
+
+
+_thread_item_adapter = TypeAdapter(ThreadItem)
+
+
+class PostgresChatKitStore(ChangeNotifyingStore):
+    """
+    ChatKit store persisted in the `threads` / `thread_items` tables.
+
+    Each call uses its own short-lived session so history survives restarts
+    and can be shared by several uvicorn workers.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        super().__init__()
+        self.session_factory = session_factory
 
     async def load_thread(self, thread_id: str, context: dict) -> ThreadMetadata:
-        if thread_id not in self.threads:
+        async with self.session_factory() as db:
+            row = await db.get(ChatThread, thread_id)
+        if row is None:
             raise NotFoundError(f"Thread {thread_id} not found")
-        return self.threads[thread_id]
+        return ThreadMetadata.model_validate(row.data)
 
     async def save_thread(self, thread: ThreadMetadata, context: dict) -> None:
-        self.threads[thread.id] = thread
+        stmt = insert(ChatThread).values(
+            id=thread.id,
+            created_at=thread.created_at,
+            data=thread.model_dump(mode="json", exclude={"items"}),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ChatThread.id], set_={"data": stmt.excluded.data}
+        )
+        async with self.session_factory() as db:
+            await db.execute(stmt)
+            await db.commit()
+        self._notify_close(thread)
 
     async def load_threads(
         self, limit: int, after: str | None, order: str, context: dict
     ) -> Page[ThreadMetadata]:
-        threads = list(self.threads.values())
-        return self._paginate(
-            threads,
-            after,
-            limit,
-            order,
-            sort_key=lambda t: t.created_at,
-            cursor_key=lambda t: t.id,
+        async with self.session_factory() as db:
+            cursor = await db.get(ChatThread, after) if after else None
+            rows, has_more = await self._paginate(
+                db, select(ChatThread), ChatThread, cursor, limit, order
+            )
+        return Page(
+            data=[ThreadMetadata.model_validate(row.data) for row in rows],
+            has_more=has_more,
+            after=rows[-1].id if has_more and rows else None,
         )
 
     async def load_thread_items(
         self, thread_id: str, after: str | None, limit: int, order: str, context: dict
     ) -> Page[ThreadItem]:
-        items = self.items.get(thread_id, [])
-        return self._paginate(
-            items,
-            after,
-            limit,
-            order,
-            sort_key=lambda i: i.created_at,
-            cursor_key=lambda i: i.id,
+        async with self.session_factory() as db:
+            cursor = await db.get(ChatThreadItem, (thread_id, after)) if after else None
+            if after and cursor is None:
+                # Paging from the start instead would repeat items the caller has
+                raise NotFoundError(f"Thread item {after} not found")
+            rows, has_more = await self._paginate(
+                db,
+                select(ChatThreadItem).where(ChatThreadItem.thread_id == thread_id),
+                ChatThreadItem,
+                cursor,
+                limit,
+                order,
+            )
+        return Page(
+            data=[_thread_item_adapter.validate_python(row.data) for row in rows],
+            has_more=has_more,
+            after=rows[-1].id if has_more and rows else None,
         )
 
     async def add_thread_item(
         self, thread_id: str, item: ThreadItem, context: dict
     ) -> None:
-        self.items[thread_id].append(item)
+        await self._upsert_item(thread_id, item)
 
     async def save_item(self, thread_id: str, item: ThreadItem, context: dict) -> None:
-        items = self.items[thread_id]
-        for idx, existing in enumerate(items):
-            if existing.id == item.id:
-                items[idx] = item
-                return
-        items.append(item)
+        self._notify_change(thread_id)
+        await self._upsert_item(thread_id, item)
+
+    async def _upsert_item(self, thread_id: str, item: ThreadItem) -> None:
+        stmt = insert(ChatThreadItem).values(
+            thread_id=thread_id,
+            id=item.id,
+            created_at=item.created_at,
+            data=item.model_dump(mode="json"),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ChatThreadItem.thread_id, ChatThreadItem.id],
+            set_={"data": stmt.excluded.data},
+        )
+        async with self.session_factory() as db:
+            await db.execute(stmt)
+            await db.commit()
 
     async def load_item(
         self, thread_id: str, item_id: str, context: dict
     ) -> ThreadItem:
-        for item in self.items.get(thread_id, []):
-            if item.id == item_id:
-                return item
-        raise NotFoundError(f"Item {item_id} not found in thread {thread_id}")
+        async with self.session_factory() as db:
+            row = await db.get(ChatThreadItem, (thread_id, item_id))
+        if row is None:
+            raise NotFoundError(f"Item {item_id} not found in thread {thread_id}")
+        return _thread_item_adapter.validate_python(row.data)
 
     async def delete_thread(self, thread_id: str, context: dict) -> None:
-        self.threads.pop(thread_id, None)
-        self.items.pop(thread_id, None)
+        self._notify_change(thread_id)
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(ChatThreadItem).where(ChatThreadItem.thread_id == thread_id)
+            )
+            await db.execute(delete(ChatThread).where(ChatThread.id == thread_id))
+            await db.commit()
 
     async def delete_thread_item(
         self, thread_id: str, item_id: str, context: dict
     ) -> None:
-        self.items[thread_id] = [
-            item for item in self.items.get(thread_id, []) if item.id != item_id
-        ]
-
-    def _paginate(
-        self,
-        rows: list,
-        after: str | None,
-        limit: int,
-        order: str,
-        sort_key,
-        cursor_key,
-    ):
-        sorted_rows = sorted(rows, key=sort_key, reverse=order == "desc")
-        start = 0
-        if after:
-            for idx, row in enumerate(sorted_rows):
-                if cursor_key(row) == after:
-                    start = idx + 1
-                    break
-        data = sorted_rows[start : start + limit]
-        has_more = start + limit < len(sorted_rows)
-        next_after = cursor_key(data[-1]) if has_more and data else None
-        return Page(data=data, has_more=has_more, after=next_after)
-
-    # Attachments are intentionally not implemented for the quickstart
+        self._notify_change(thread_id)
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(ChatThreadItem).where(
+                    ChatThreadItem.thread_id == thread_id,
+                    ChatThreadItem.id == item_id,
+                )
+            )
+            await db.commit()
+
+    async def _paginate(self, db, stmt, model, cursor, limit: int, order: str):
+        # Keyset pagination on (created_at, id), served by the composite index.
+        key = tuple_(model.created_at, model.id)
+        if cursor is not None:
+            cursor_key = tuple_(cursor.created_at, cursor.id)
+            stmt = stmt.where(key < cursor_key if order == "desc" else key > cursor_key)
+        if order == "desc":
+            stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+        else:
+            stmt = stmt.order_by(model.created_at, model.id)
+        rows = (await db.scalars(stmt.limit(limit + 1))).all()
+        return rows[:limit], len(rows) > limit
+
+    # Attachments are intentionally not implemented
 
     async def save_attachment(self, attachment: Attachment, context: dict) -> None:
         raise NotImplementedError()
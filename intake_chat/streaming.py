@@ -0,0 +1,67 @@
+import asyncio
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable
+
+from config import settings
+
+
+# SSE comment frame: ignored by the client, keeps proxies from closing the stream
+KEEPALIVE = b": keepalive\n\n"
+
+# Response headers for every SSE endpoint: no caching, no proxy buffering (nginx)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+_DONE = object()
+
+
+async def stream_with_heartbeat(
+    events: AsyncIterable[bytes],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    heartbeat_seconds: float = settings.CHAT_STREAM_HEARTBEAT_SECONDS,
+    buffer_size: int = settings.CHAT_STREAM_BUFFER_EVENTS,
+) -> AsyncIterator[bytes]:
+    """
+    Relay an SSE stream (ChatKit's, or intake change events) to one client.
+
+    The run is drained by a producer task into a bounded queue, so a slow
+    client pauses the run instead of buffering without limit. While no event
+    is ready a keepalive comment is sent every `heartbeat_seconds`. When the
+    client goes away (or the response is cancelled) the producer is
+    cancelled and `events` is closed, which stops the agent run. Pass the
+    underlying generator (e.g. `StreamingResult.json_events`) so closing it
+    reaches the run.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+    iterator = aiter(events)
+
+    async def produce() -> None:
+        try:
+            async for chunk in iterator:
+                await queue.put(chunk)
+        except Exception as exc:
+            await queue.put(exc)
+        else:
+            await queue.put(_DONE)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(queue.get(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                yield KEEPALIVE
+                continue
+            if chunk is _DONE:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        # A producer cancelled while blocked on queue.put leaves the generator
+        # suspended; close it so its cleanup (cancelling the run) executes now.
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
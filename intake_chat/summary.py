@@ -0,0 +1,85 @@
+import asyncio
+import logging
+
+from agents import Runner
+from chatkit.store import Store
+
+from intake_chat.context import PAGE_SIZE, ConversationContextCache, item_text
+from medical_agents.history_summary_agent import history_summary_agent
+
+logger = logging.getLogger(__name__)
+
+# Keys in ThreadMetadata.metadata
+SUMMARY_KEY = "history_summary"
+SUMMARY_THROUGH_KEY = "history_summary_through"
+
+
+class HistorySummarizer:
+    """
+    Keeps a rolling summary of the turns that have left the verbatim history
+    window. The summary is stored in the thread's metadata and refreshed in a
+    background task after each turn, never inline with the response.
+    """
+
+    def __init__(self, conversation_context: ConversationContextCache):
+        self.conversation_context = conversation_context
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def schedule_refresh(self, store: Store, thread_id: str, context) -> None:
+        if thread_id in self._tasks:
+            return  # a refresh for this thread is already running
+        task = asyncio.create_task(self.refresh(store, thread_id, context))
+        self._tasks[thread_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(thread_id, None))
+
+    async def refresh(self, store: Store, thread_id: str, context) -> None:
+        try:
+            window_start_id = self.conversation_context.window_start_id(thread_id)
+            if window_start_id is None:
+                return
+            thread = await store.load_thread(thread_id, context=context)
+            pending = await self._load_unsummarized_items(
+                store,
+                thread_id,
+                thread.metadata.get(SUMMARY_THROUGH_KEY),
+                window_start_id,
+                context,
+            )
+            if not pending:
+                return
+
+            summary = thread.metadata.get(SUMMARY_KEY, "")
+            lines = [line for line in map(item_text, pending) if line]
+            if lines:
+                result = await Runner.run(
+                    history_summary_agent,
+                    f"PREVIOUS SUMMARY:\n{summary}\n\nNEW TURNS:\n" + "\n".join(lines),
+                )
+                summary = result.final_output
+
+            thread = await store.load_thread(thread_id, context=context)
+            thread.metadata[SUMMARY_KEY] = summary
+            thread.metadata[SUMMARY_THROUGH_KEY] = pending[-1].id
+            await store.save_thread(thread, context=context)
+        except Exception:
+            logger.exception("Failed to refresh history summary for %s", thread_id)
+
+    async def _load_unsummarized_items(
+        self, store: Store, thread_id: str, after: str | None, stop_id: str, context
+    ) -> list:
+        """
+        Items after the last summarized one, up to (excluding) `stop_id`.
+        Empty if `stop_id` is never reached, i.e. the summary already covers it.
+        """
+        pending = []
+        while True:
+            page = await store.load_thread_items(
+                thread_id, after=after, limit=PAGE_SIZE, order="asc", context=context
+            )
+            for item in page.data:
+                if item.id == stop_id:
+                    return pending
+                pending.append(item)
+            if not page.has_more:
+                return []
+            after = page.after
@@ -0,0 +1,68 @@
+import random
+from typing import Any
+
+from agents import set_trace_processors, set_tracing_disabled
+from agents.tracing import Span, Trace, TracingProcessor
+from braintrust import init_logger
+from braintrust.wrappers.openai import BraintrustTracingProcessor
+
+from config import settings
+
+
+class SampledTracingProcessor(TracingProcessor):
+    """
+    Forwards only a `sample_rate` fraction of traces to `processor`.
+    The decision is made once per trace so sampled traces stay complete.
+    """
+
+    def __init__(self, processor: TracingProcessor, sample_rate: float):
+        self.processor = processor
+        self.sample_rate = sample_rate
+        self._sampled: set[str] = set()
+
+    def on_trace_start(self, trace: Trace) -> None:
+        if random.random() < self.sample_rate:
+            self._sampled.add(trace.trace_id)
+            self.processor.on_trace_start(trace)
+
+    def on_trace_end(self, trace: Trace) -> None:
+        if trace.trace_id in self._sampled:
+            self._sampled.discard(trace.trace_id)
+            self.processor.on_trace_end(trace)
+
+    def on_span_start(self, span: Span[Any]) -> None:
+        if span.trace_id in self._sampled:
+            self.processor.on_span_start(span)
+
+    def on_span_end(self, span: Span[Any]) -> None:
+        if span.trace_id in self._sampled:
+            self.processor.on_span_end(span)
+
+    def shutdown(self) -> None:
+        self.processor.shutdown()
+
+    def force_flush(self) -> None:
+        self.processor.force_flush()
+
+
+def configure_tracing() -> None:
+    """
+    Set up agent tracing once per process, according to `TRACING_MODE`:
+    - "off": no tracing
+    - "sampled": `TRACING_SAMPLE_RATE` of traces are sent to Braintrust
+    - "full": every trace is sent to Braintrust
+
+    Braintrust batches and sends events from a background thread
+    (`async_flush=True`), so exporting never blocks the SSE stream.
+    """
+    if settings.TRACING_MODE == "off":
+        set_trace_processors([])
+        set_tracing_disabled(True)
+        return
+
+    processor: TracingProcessor = BraintrustTracingProcessor(
+        init_logger("Capstone", api_key=settings.BRAINTRUST_API_KEY, async_flush=True)
+    )
+    if settings.TRACING_MODE == "sampled":
+        processor = SampledTracingProcessor(processor, settings.TRACING_SAMPLE_RATE)
+    set_trace_processors([processor])
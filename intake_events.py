@@ -0,0 +1,66 @@
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator
+
+
+# Per-subscriber buffer; a client that falls this far behind is told to resync.
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class IntakeChangeBroker:
+    """
+    In-process pub/sub of medical interview changes, keyed by interview id.
+
+    Intake writers call `publish` after committing; each open SSE connection
+    holds one subscription. Only processes that made the write see the event,
+    which matches a single API process; a multi-process deployment would put
+    Postgres LISTEN/NOTIFY behind the same interface.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: defaultdict[int, set[asyncio.Queue]] = defaultdict(set)
+
+    @contextmanager
+    def subscribe(self, interview_id: int) -> Iterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[interview_id].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(interview_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[interview_id]
+
+    def publish(self, interview_id: int, event: str, data: dict) -> None:
+        for queue in self._subscribers.get(interview_id, ()):
+            if queue.full():
+                # Buffered changes are stale anyway: replace them with one
+                # "resync" event so the client reloads the whole form.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("resync", {}))
+                continue
+            queue.put_nowait((event, data))
+
+    def publish_intake(self, interview_id: int, version: int, changes: dict) -> None:
+        """Send the intake fields a write changed, with the new row version."""
+        self.publish(interview_id, "intake", {"version": version, "changes": changes})
+
+    async def stream(self, interview_id: int) -> AsyncIterator[bytes]:
+        """
+        SSE frames of one subscription, until the generator is closed.
+        Wrap it in `stream_with_heartbeat` for keepalives and disconnect handling.
+        """
+        with self.subscribe(interview_id) as queue:
+            while True:
+                event, data = await queue.get()
+                payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+                yield f"event: {event}\ndata: {payload}\n\n".encode()
+
+
+intake_events = IntakeChangeBroker()
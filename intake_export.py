@@ -0,0 +1,224 @@
+"""
+Export medical interview intakes as NDJSON or flattened CSV.
+
+Used by `GET /api/medical_interviews/export` and as a CLI:
+
+    python intake_export.py --format csv --date-from 2025-11-01 > intakes.csv
+    python intake_export.py --status draft --output drafts.ndjson
+
+Rows are read through a server-side cursor (`yield_per`) and written one
+batch at a time, so memory use stays flat regardless of the result size.
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Iterator, Literal
+
+from sqlalchemy import Select, select
+
+from db import AsyncSessionLocal, engine
+from models import MedicalInterview, InterviewStatus
+from schemas import to_naive_utc
+
+
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# One CSV row per symptom / medication / allergy (or one row with an empty
+# item_type when the intake has none), with the interview columns repeated.
+CSV_COLUMNS = [
+    "interview_id",
+    "appointment_id",
+    "status",
+    "created_at",
+    "full_name",
+    "age_years",
+    "sex",
+    "visit_reason",
+    "duration",
+    "severity_0_10",
+    "notes",
+    "item_type",
+    "name",
+    "detail",
+    "onset",
+    "severity",
+    "dose",
+    "frequency",
+    "reaction",
+]
+
+
+def export_query(
+    status: InterviewStatus | None = InterviewStatus.COMPLETED,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> Select:
+    """
+    Interviews to export, filtered by status and created_at range [from, to).
+    Timezone-aware bounds are converted to naive UTC to match the column.
+    """
+    query = select(
+        MedicalInterview.id,
+        MedicalInterview.appointment_id,
+        MedicalInterview.status,
+        MedicalInterview.created_at,
+        MedicalInterview.intake,
+    ).order_by(MedicalInterview.id)
+    if status is not None:
+        query = query.where(MedicalInterview.status == status)
+    if date_from is not None:
+        query = query.where(MedicalInterview.created_at >= to_naive_utc(date_from))
+    if date_to is not None:
+        query = query.where(MedicalInterview.created_at < to_naive_utc(date_to))
+    return query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def _record(row) -> dict:
+    return {
+        "id": row.id,
+        "appointment_id": row.appointment_id,
+        "status": row.status.value if row.status is not None else None,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "intake": row.intake or {},
+    }
+
+
+def _csv_rows(record: dict) -> Iterator[list]:
+    intake = record["intake"]
+    base = [
+        record["id"],
+        record["appointment_id"],
+        record["status"],
+        record["created_at"],
+        intake.get("full_name"),
+        intake.get("age_years"),
+        intake.get("sex"),
+        intake.get("visit_reason"),
+        intake.get("duration"),
+        intake.get("severity_0_10"),
+        intake.get("notes"),
+    ]
+    items = [
+        {
+            "item_type": "symptom",
+            "name": symptom.get("name"),
+            "detail": symptom.get("detail"),
+            "onset": symptom.get("onset"),
+            "severity": symptom.get("severity_0_10"),
+        }
+        for symptom in intake.get("symptoms") or []
+    ]
+    items += [
+        {
+            "item_type": "medication",
+            "name": medication.get("name"),
+            "detail": medication.get("notes"),
+            "dose": medication.get("dose"),
+            "frequency": medication.get("frequency"),
+        }
+        for medication in intake.get("medications") or []
+    ]
+    items += [
+        {
+            "item_type": "allergy",
+            "name": allergy.get("allergen"),
+            "severity": allergy.get("severity"),
+            "reaction": allergy.get("reaction"),
+        }
+        for allergy in intake.get("allergies") or []
+    ]
+    item_columns = CSV_COLUMNS[len(base) :]
+    for item in items or [{}]:
+        yield base + [item.get(column) for column in item_columns]
+
+
+def format_header(fmt: ExportFormat) -> str:
+    if fmt != "csv":
+        return ""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(CSV_COLUMNS)
+    return buffer.getvalue()
+
+
+def format_rows(rows: Iterable, fmt: ExportFormat) -> str:
+    """Serialize one batch of rows into a single text chunk."""
+    records = (_record(row) for row in rows)
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for record in records
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerows(_csv_rows(record))
+    return buffer.getvalue()
+
+
+async def stream_export(query: Select, fmt: ExportFormat) -> AsyncIterator[str]:
+    """
+    Async chunks for a StreamingResponse. The session is opened here rather
+    than taken from the request, since it must stay open while the body streams.
+    """
+    yield format_header(fmt)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            yield format_rows(rows, fmt)
+
+
+def write_export(query: Select, fmt: ExportFormat, out) -> int:
+    """Write the export to a text file object with the sync engine; returns the row count."""
+    count = 0
+    out.write(format_header(fmt))
+    with engine.connect() as conn:
+        for rows in conn.execute(query).partitions():
+            out.write(format_rows(rows, fmt))
+            count += len(rows)
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--format", choices=list(MEDIA_TYPES), default="ndjson")
+    parser.add_argument(
+        "--status",
+        choices=[s.value for s in InterviewStatus] + ["all"],
+        default=InterviewStatus.COMPLETED.value,
+        help="Interview status to export (default: completed)",
+    )
+    parser.add_argument(
+        "--date-from", type=datetime.fromisoformat, help="created_at >= (ISO 8601)"
+    )
+    parser.add_argument(
+        "--date-to", type=datetime.fromisoformat, help="created_at < (ISO 8601)"
+    )
+    parser.add_argument("--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    query = export_query(
+        status=None if args.status == "all" else InterviewStatus(args.status),
+        date_from=args.date_from,
+        date_to=args.date_to,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            count = write_export(query, args.format, out)
+    else:
+        count = write_export(query, args.format, sys.stdout)
+    print(f"Exported {count} interviews", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
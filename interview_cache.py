@@ -0,0 +1,108 @@
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import Response, status
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+
+
+def interview_etag(interview_id: int, version: int) -> str:
+    return f'"mi-{interview_id}-{version}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return "*" in candidates or etag in (tag.removeprefix("W/") for tag in candidates)
+
+
+@dataclass
+class CachedInterview:
+    interview_id: int
+    appointment_id: int
+    etag: str
+    body: bytes
+    expires_at: float
+
+    def response(self, if_none_match: str | None) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, self.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(
+            content=self.body, media_type="application/json", headers=headers
+        )
+
+
+class InterviewCache:
+    """
+    Small LRU of serialized medical interviews keyed by id, plus the latest
+    interview id per appointment.
+
+    The ETag is derived from the row version, which every intake write bumps.
+    Writers in this process call `invalidate` after committing, so a cached
+    entry (and a 304 for its ETag) is served without touching the DB.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.INTERVIEW_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = settings.INTERVIEW_CACHE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[int, CachedInterview] = OrderedDict()
+        self._latest: OrderedDict[int, int] = OrderedDict()
+
+    def get(self, interview_id: int) -> CachedInterview | None:
+        entry = self._entries.get(interview_id)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._entries.pop(interview_id, None)
+            return None
+        self._entries.move_to_end(interview_id)
+        return entry
+
+    def latest_for_appointment(self, appointment_id: int) -> CachedInterview | None:
+        interview_id = self._latest.get(appointment_id)
+        if interview_id is None:
+            return None
+        entry = self.get(interview_id)
+        if entry is None:
+            self._latest.pop(appointment_id, None)
+        return entry
+
+    def put(self, obj, latest: bool = False) -> CachedInterview:
+        """Cache a MedicalInterview row as it is returned by the API."""
+        entry = CachedInterview(
+            interview_id=obj.id,
+            appointment_id=obj.appointment_id,
+            etag=interview_etag(obj.id, obj.version),
+            body=json.dumps(jsonable_encoder(obj), ensure_ascii=False).encode(),
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        self._entries[obj.id] = entry
+        self._entries.move_to_end(obj.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        if latest:
+            self._latest[obj.appointment_id] = obj.id
+            self._latest.move_to_end(obj.appointment_id)
+            while len(self._latest) > self.max_entries:
+                self._latest.popitem(last=False)
+        return entry
+
+    def invalidate(self, interview_id: int) -> None:
+        self._entries.pop(interview_id, None)
+
+    def invalidate_appointment(self, appointment_id: int) -> None:
+        """Forget the latest interview for an appointment (e.g. a new one was created)."""
+        self._latest.pop(appointment_id, None)
+
+
+interview_cache = InterviewCache()
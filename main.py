@@ -1,4 +1,7 @@
 import os
+import base64
+import binascii
+import json
 from typing import Annotated
 from datetime import datetime
 
@@ -9,24 +12,42 @@ from fastapi import (
     Response,
     HTTPException,
     Form,
+    Query,
     status,
     Depends,
 )
-from fastapi.responses import FileResponse, StreamingResponse
-from sqlalchemy import desc
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import desc, insert, select, tuple_
+from sqlalchemy.orm import selectinload
 from openai import OpenAI
 
-from db import get_db, Session
-from models import Appointment, MedicalInterview
+from db import get_db, get_pool_status, AsyncSession
+from interview_cache import interview_cache
+from intake_events import intake_events
+from models import Appointment, MedicalInterview, Patient, InterviewStatus
 from schemas import (
     CreateAppointmentSchema,
     ReadAppointmentSchema,
+    ReadAppointmentPage,
     UpdateAppointmentSchema,
+    NaiveUTCDatetime,
+    to_naive_utc,
     CreateMedicalInterview,
+    BulkCreateMedicalInterviews,
+    BulkCreateMedicalInterviewResult,
 )
 from chatkit.server import StreamingResult
 from intake_chat.server import MyChatKitServer, MyRequestContext
-from intake_chat.store import MyChatKitStore
+from intake_chat.store import PostgresChatKitStore
+from intake_chat.tracing import configure_tracing
+from intake_chat.streaming import SSE_HEADERS, stream_with_heartbeat
+from intake_chat.metrics import registry as metrics_registry
+from intake_export import (
+    MEDIA_TYPES,
+    ExportFormat,
+    export_query,
+    stream_export,
+)
 
 
 from config import settings
@@ -51,18 +72,28 @@ app = FastAPI()
 #     return {"client_secret": s.client_secret}
 
 
-server = MyChatKitServer(store=MyChatKitStore())
+# BraintrustへのTracing設定 (Configure tracing once at startup)
+configure_tracing()
+
+server = MyChatKitServer(store=PostgresChatKitStore())
 
 
 # Chatkit Endpoint
 @app.post("/chatkit")
-async def chatkit(request: Request, db: Session = Depends(get_db)):
+async def chatkit(request: Request):
+    # DBセッションは各DB操作ごとに開閉する (No request-wide DB session: each DB
+    # operation checks out a connection only while it runs)
     interview_id = request.headers.get("x-interview-id") or "anonymous"
-    context = MyRequestContext(db=db, interview_id=int(interview_id))
+    context = MyRequestContext(interview_id=int(interview_id))
 
     result = await server.process(await request.body(), context=context)
     if isinstance(result, StreamingResult):
-        return StreamingResponse(result, media_type="text/event-stream")
+        # 切断時はモデル実行を止める (Stop the run on client disconnect)
+        return StreamingResponse(
+            stream_with_heartbeat(result.json_events, request.is_disconnected),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS,
+        )
     return Response(content=result.json, media_type="application/json")
 
 
@@ -70,7 +101,7 @@ async def chatkit(request: Request, db: Session = Depends(get_db)):
 @app.post("/api/appointments")
 async def api_create_appointment(
     appointment_form: Annotated[CreateAppointmentSchema, Form()],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     db_appointment = Appointment(
         status=appointment_form.status,
@@ -78,33 +109,101 @@ async def api_create_appointment(
         date=appointment_form.date,
     )
     db.add(db_appointment)
-    db.commit()
-    db.refresh(db_appointment)
+    await db.commit()
+    await db.refresh(db_appointment)
     return db_appointment
 
 
 # Read Appointments
-@app.get("/api/appointments", response_model=list[ReadAppointmentSchema])
-async def api_read_appointments(db: Session = Depends(get_db)):
-    db_appointments = (
-        db.query(Appointment)
-        .join(Appointment.patient)
-        .order_by(desc(Appointment.date))
-        .all()
-    )
+APPOINTMENTS_PAGE_LIMIT = 200
 
-    return [
-        ReadAppointmentSchema(
-            id=appointment.id,
-            status=appointment.status,
-            first_name=appointment.patient.first_name,
-            last_name=appointment.patient.last_name,
-            age=appointment.patient.age,
-            gender=appointment.patient.gender,
-            date=appointment.date,
+
+def encode_appointment_cursor(date: datetime, appointment_id: int) -> str:
+    raw = json.dumps([date.isoformat(), appointment_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_appointment_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        date, appointment_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return to_naive_utc(datetime.fromisoformat(date)), int(appointment_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
         )
-        for appointment in db_appointments
-    ]
+
+
+def appointments_page_query(
+    limit: int,
+    status_filter: str | None = None,
+    patient_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    after: tuple[datetime, int] | None = None,
+):
+    """One page (plus one row to detect more) of the appointment listing."""
+    # 必要な列だけを取得し、(date, id) のキーセットでページングする
+    # (Select only the listed columns and page by the (date, id) keyset)
+    query = (
+        select(
+            Appointment.id,
+            Appointment.status,
+            Patient.first_name,
+            Patient.last_name,
+            Patient.age,
+            Patient.gender,
+            Appointment.date,
+        )
+        .join(Patient, Appointment.patient_id == Patient.id)
+        .where(Appointment.date.is_not(None))
+        .order_by(desc(Appointment.date), desc(Appointment.id))
+        .limit(limit + 1)
+    )
+    if status_filter is not None:
+        query = query.where(Appointment.status == status_filter)
+    if patient_id is not None:
+        query = query.where(Appointment.patient_id == patient_id)
+    if date_from is not None:
+        query = query.where(Appointment.date >= date_from)
+    if date_to is not None:
+        query = query.where(Appointment.date < date_to)
+    if after is not None:
+        query = query.where(tuple_(Appointment.date, Appointment.id) < tuple_(*after))
+    return query
+
+
+@app.get("/api/appointments", response_model=ReadAppointmentPage)
+async def api_read_appointments(
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=APPOINTMENTS_PAGE_LIMIT)] = 50,
+    status_filter: Annotated[str | None, Query(alias="status")] = None,
+    patient_id: int | None = None,
+    date_from: NaiveUTCDatetime | None = None,
+    date_to: NaiveUTCDatetime | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    query = appointments_page_query(
+        limit,
+        status_filter=status_filter,
+        patient_id=patient_id,
+        date_from=date_from,
+        date_to=date_to,
+        after=decode_appointment_cursor(cursor) if cursor is not None else None,
+    )
+
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_appointment_cursor(rows[-1].date, rows[-1].id)
+
+    # DBの行はすでに型が揃っているので検証を省き、pydanticのJSONエンコーダで直接返す
+    # (Rows are already typed: skip validation and serialize with pydantic's encoder)
+    page = ReadAppointmentPage.model_construct(
+        items=[ReadAppointmentSchema.model_construct(**row._mapping) for row in rows],
+        next_cursor=next_cursor,
+    )
+    return Response(content=page.model_dump_json(), media_type="application/json")
 
 
 # Update Appointment
@@ -112,9 +211,9 @@ async def api_read_appointments(db: Session = Depends(get_db)):
 async def api_update_appointment(
     appointment_id: int,
     appointment_form: Annotated[UpdateAppointmentSchema, Form()],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    db_appointment = db.get(Appointment, appointment_id)
+    db_appointment = await db.get(Appointment, appointment_id)
     if not db_appointment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found."
@@ -123,18 +222,32 @@ async def api_update_appointment(
         db_appointment.status = appointment_form.status
     if appointment_form.date is not None:
         db_appointment.date = appointment_form.date
-    db.commit()
-    db.refresh(db_appointment)
+    await db.commit()
+    await db.refresh(db_appointment)
     return db_appointment
 
 
 # Create Medical Interviews
+def initial_intake(patient, initial_consult: str | None) -> dict:
+    """Intake prefilled from the patient's profile and first message."""
+    return {
+        "full_name": " ".join([patient.first_name, patient.last_name]),
+        "age_years": patient.age,
+        "sex": patient.gender,
+        "initial_patient_message": initial_consult,
+    }
+
+
 @app.post("/api/medical_interviews")
 async def api_create_medical_interviews(
     medical_interview_form: Annotated[CreateMedicalInterview, Form()],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    db_appointment = db.get(Appointment, medical_interview_form.appointment_id)
+    db_appointment = await db.get(
+        Appointment,
+        medical_interview_form.appointment_id,
+        options=[selectinload(Appointment.patient)],
+    )
     if not db_appointment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found."
@@ -145,46 +258,174 @@ async def api_create_medical_interviews(
         appointment_id=medical_interview_form.appointment_id,
         initial_consult=medical_interview_form.initial_consult,
         created_at=datetime.now(),
-        intake={
-            "full_name": " ".join(
-                [db_appointment.patient.first_name, db_appointment.patient.last_name]
-            ),
-            "age_years": db_appointment.patient.age,
-            "sex": db_appointment.patient.gender,
-            "initial_patient_message": medical_interview_form.initial_consult,
-        },
+        intake=initial_intake(
+            db_appointment.patient, medical_interview_form.initial_consult
+        ),
     )
     db.add(db_medical_interview)
-    db.commit()
-    db.refresh(db_medical_interview)
+    await db.commit()
+    await db.refresh(db_medical_interview)
+    interview_cache.invalidate_appointment(db_medical_interview.appointment_id)
     return db_medical_interview
 
 
+# Create Medical Interviews for many appointments at once
+@app.post(
+    "/api/medical_interviews/bulk",
+    response_model=list[BulkCreateMedicalInterviewResult],
+)
+async def api_bulk_create_medical_interviews(
+    bulk_form: BulkCreateMedicalInterviews,
+    db: AsyncSession = Depends(get_db),
+):
+    appointment_ids = list(dict.fromkeys(bulk_form.appointment_ids))
+
+    # 予約と患者を1回のJOINで取得 (Load appointments and patients in one joined query)
+    patients = {
+        row.appointment_id: row
+        for row in await db.execute(
+            select(
+                Appointment.id.label("appointment_id"),
+                Patient.first_name,
+                Patient.last_name,
+                Patient.age,
+                Patient.gender,
+            )
+            .join(Patient, Appointment.patient_id == Patient.id)
+            .where(Appointment.id.in_(appointment_ids))
+        )
+    }
+
+    now = datetime.now()
+    values = [
+        {
+            "status": "draft",
+            "appointment_id": appointment_id,
+            "initial_consult": bulk_form.initial_consult,
+            "created_at": now,
+            "intake": initial_intake(
+                patients[appointment_id], bulk_form.initial_consult
+            ),
+        }
+        for appointment_id in appointment_ids
+        if appointment_id in patients
+    ]
+
+    # 1つのINSERT文でまとめて作成 (Insert all drafts in a single statement)
+    created = {}
+    if values:
+        result = await db.execute(
+            insert(MedicalInterview)
+            .values(values)
+            .returning(MedicalInterview.appointment_id, MedicalInterview.id)
+        )
+        created = dict(result.tuples().all())
+        await db.commit()
+        for appointment_id in created:
+            interview_cache.invalidate_appointment(appointment_id)
+
+    return [
+        BulkCreateMedicalInterviewResult(
+            appointment_id=appointment_id,
+            ok=True,
+            medical_interview_id=created[appointment_id],
+        )
+        if appointment_id in created
+        else BulkCreateMedicalInterviewResult(
+            appointment_id=appointment_id, ok=False, error="Appointment not found."
+        )
+        for appointment_id in appointment_ids
+    ]
+
+
 # Read Medical Interviews
+def latest_interview_query(appointment_id: int):
+    return (
+        select(MedicalInterview)
+        .filter(MedicalInterview.appointment_id == appointment_id)
+        .order_by(desc(MedicalInterview.created_at))
+        .limit(1)
+    )
+
+
+# ETag/If-None-Match: キャッシュにあればDBに触れずに304または本文を返す
+# (Answer from the in-process cache, with 304 on a matching ETag, without touching the DB)
 @app.get("/api/medical_interviews")
 async def api_read_medical_interviews(
-    appointment_id: int, db: Session = Depends(get_db)
+    appointment_id: int, request: Request, db: AsyncSession = Depends(get_db)
 ):
-    db_medical_interviews = (
-        db.query(MedicalInterview)
-        .filter(MedicalInterview.appointment_id == appointment_id)
-        .order_by(desc(MedicalInterview.created_at))
-        .first()
+    cached = interview_cache.latest_for_appointment(appointment_id)
+    if cached is None:
+        db_medical_interviews = await db.scalar(latest_interview_query(appointment_id))
+        if db_medical_interviews is None:
+            return None
+        cached = interview_cache.put(db_medical_interviews, latest=True)
+    return cached.response(request.headers.get("if-none-match"))
+
+
+# Export Medical Interviews (NDJSON / CSV)
+# "/{interview_id}" より前に定義する (Must be declared before "/{interview_id}")
+@app.get("/api/medical_interviews/export")
+async def api_export_medical_interviews(
+    format: ExportFormat = "ndjson",
+    status_filter: Annotated[
+        InterviewStatus | None, Query(alias="status")
+    ] = InterviewStatus.COMPLETED,
+    date_from: NaiveUTCDatetime | None = None,
+    date_to: NaiveUTCDatetime | None = None,
+):
+    query = export_query(status=status_filter, date_from=date_from, date_to=date_to)
+    return StreamingResponse(
+        stream_export(query, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="medical_interviews.{format}"'
+        },
     )
-    return db_medical_interviews
 
 
 # Read One Medical Interviews
 @app.get("/api/medical_interviews/{interview_id}")
 async def api_read_medical_interview_by_id(
-    interview_id: int, db: Session = Depends(get_db)
+    interview_id: int, request: Request, db: AsyncSession = Depends(get_db)
 ):
-    db_medical_interview = db.get(MedicalInterview, interview_id)
-    if not db_medical_interview:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Medical interview not found."
-        )
-    return db_medical_interview
+    cached = interview_cache.get(interview_id)
+    if cached is None:
+        db_medical_interview = await db.get(MedicalInterview, interview_id)
+        if not db_medical_interview:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Medical interview not found.",
+            )
+        cached = interview_cache.put(db_medical_interview)
+    return cached.response(request.headers.get("if-none-match"))
+
+
+# Medical Interview change events (SSE)
+# 問診票の変更をプッシュする (Push intake changes instead of client polling)
+@app.get("/api/medical_interviews/{interview_id}/events")
+async def api_stream_medical_interview_events(interview_id: int, request: Request):
+    return StreamingResponse(
+        stream_with_heartbeat(
+            intake_events.stream(interview_id), request.is_disconnected
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+# Database Connection Pool Status
+@app.get("/api/db/pool")
+async def api_read_db_pool_status():
+    return get_pool_status()
+
+
+# Prometheus-style metrics (chat stage and tool latency histograms)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        metrics_registry.render(), media_type="text/plain; version=0.0.4"
+    )
 
 
 @app.get("/{full_path:path}")
@@ -0,0 +1,15 @@
+from openai.types.shared import Reasoning
+from agents import Agent, ModelSettings
+
+from config import settings
+from medical_agents.tools import prompt_instructions
+
+
+SUMMARY_PROMPT_PATH = "./prompts/history_summary_prompt.md"
+
+history_summary_agent = Agent(
+    name="History Summary Agent",
+    instructions=prompt_instructions(SUMMARY_PROMPT_PATH),
+    model=settings.CHAT_SUMMARY_MODEL,
+    model_settings=ModelSettings(reasoning=Reasoning(effort="low"), verbosity="low"),
+)
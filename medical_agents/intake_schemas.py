@@ -1,7 +1,8 @@
+import json
 from typing import Annotated, Literal
 from datetime import datetime
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, ValidationError
 
 
 class BaseSchema(BaseModel):
@@ -86,14 +87,40 @@ class IntakeForm(BaseSchema):
     notes: str | None = Field(default=None, description="その他メモ（自由記述）")
 
 
+def intake_to_prompt(intake: dict | None) -> str:
+    """
+    Compact, deterministic JSON of an intake form for the model's context.
+
+    Drops nulls, defaults and bookkeeping fields (version, updated_at) and
+    keeps a stable key order, so an unchanged form is byte-identical across
+    turns and provider-side prompt caching can hit.
+    """
+    try:
+        data = IntakeForm.model_validate(intake or {}).model_dump(
+            mode="json",
+            exclude_none=True,
+            exclude_defaults=True,
+            exclude={"version", "updated_at"},
+        )
+    except ValidationError:
+        # Fall back to the raw JSONB rather than failing the chat turn.
+        data = {
+            k: v
+            for k, v in (intake or {}).items()
+            if v is not None and k not in ("version", "updated_at")
+        }
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
 # --- IntakeForm Update Schema ---
+# List fields (symptoms/medications/allergies) are edited one item at a time
+# with ListAction instead of being replaced as a whole.
 class IntakeFormPatch(BaseSchema):
     visit_reason: str | None = None
     duration: str | None = None
     severity_0_10: Annotated[int, Field(ge=0, le=10)] | None = None
 
-    symptoms: list[Symptom] | None = None
-    medications: list[Medication] | None = None
-    allergies: list[Allergy] | None = None
-
     notes: str | None = None
+
+
+ListAction = Literal["append", "update", "remove"]
@@ -1,31 +1,50 @@
+from functools import lru_cache
+
 from openai.types.shared import Reasoning
 from agents import Agent, ModelSettings
 
-from medical_agents.tools import load_prompt_md, update_intake_form, report_completion
+from medical_agents.tools import (
+    prompt_instructions,
+    update_intake_form,
+    edit_symptom,
+    edit_medication,
+    edit_allergy,
+    report_completion,
+)
 from medical_agents.review_interview_agent import review_interview_agent
 
 
-INTERVIEW_PROMPT = load_prompt_md("./prompts/medical_interview_prompt.md")
+INTERVIEW_PROMPT_PATH = "./prompts/medical_interview_prompt.md"
+
+# Built once at import: as_tool() wraps the reviewer and builds its tool schema.
+REVIEW_INTERVIEW_TOOL = review_interview_agent.as_tool(
+    tool_name="review_interview_agent",
+    tool_description="""
+        問診内容に不十分な部分が無いか確認するレビュアーエージェントです。
+        問診票の内容を受け渡してレビューを依頼して下さい。
+        結果として合否と総括コメントを受け取れます。
+    """,
+)
 
 
-def medical_interview_agent(model: str) -> Agent:
+@lru_cache(maxsize=16)
+def medical_interview_agent(
+    model: str, reasoning_effort: str = "medium", verbosity: str = "low"
+) -> Agent:
+    # Agents hold no per-run state, so one instance per settings is shared by all turns.
     return Agent(
         name="Medical Interview Orchestrate Agent",
-        instructions=INTERVIEW_PROMPT,
+        instructions=prompt_instructions(INTERVIEW_PROMPT_PATH),
         model=model,
         model_settings=ModelSettings(
-            reasoning=Reasoning(effort="medium"), verbosity="low"
+            reasoning=Reasoning(effort=reasoning_effort), verbosity=verbosity
         ),
         tools=[
             update_intake_form,
-            review_interview_agent.as_tool(
-                tool_name="review_interview_agent",
-                tool_description="""
-                    問診内容に不十分な部分が無いか確認するレビュアーエージェントです。
-                    問診票の内容を受け渡してレビューを依頼して下さい。
-                    結果として合否と総括コメントを受け取れます。
-                """,
-            ),
+            edit_symptom,
+            edit_medication,
+            edit_allergy,
+            REVIEW_INTERVIEW_TOOL,
             report_completion,
         ],
     )
@@ -2,7 +2,11 @@ from pydantic import BaseModel, Field
 from openai.types.shared import Reasoning
 from agents import Agent, ModelSettings, WebSearchTool
 
-from medical_agents.tools import load_prompt_md, report_progress, read_intake_form
+from medical_agents.tools import (
+    prompt_instructions,
+    report_progress,
+    read_intake_form,
+)
 
 
 class ReviewInterviewOutput(BaseModel):
@@ -14,11 +18,11 @@ class ReviewInterviewOutput(BaseModel):
     )
 
 
-REVIEW_PROMPT = load_prompt_md("./prompts/review_interview_prompt.md")
+REVIEW_PROMPT_PATH = "./prompts/review_interview_prompt.md"
 
 review_interview_agent = Agent(
     name="Review Interview Agent",
-    instructions=REVIEW_PROMPT,
+    instructions=prompt_instructions(REVIEW_PROMPT_PATH),
     model="gpt-5.2",
     model_settings=ModelSettings(
         reasoning=Reasoning(effort="medium"), verbosity="medium"
@@ -1,7 +1,9 @@
 from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
 
+from sqlalchemy import Text, case, func, literal, select, update
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, aggregate_order_by
 from agents import function_tool, RunContextWrapper
 from chatkit.agents import AgentContext
 from chatkit.types import (
@@ -11,26 +13,151 @@ from chatkit.types import (
 )
 from chatkit.widgets import WidgetTemplate
 
-from db import Session
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from db import AsyncSession, AsyncSessionLocal
+from interview_cache import interview_cache
+from intake_events import intake_events
 from models import Appointment, MedicalInterview
 from schemas import UpdateMedicalInterview
-from medical_agents.intake_schemas import IntakeForm, IntakeFormPatch
+from medical_agents.intake_schemas import (
+    IntakeFormPatch,
+    ListAction,
+    Symptom,
+    Medication,
+    Allergy,
+)
 
 
 @dataclass
 class MyRequestContext:
-    db: Session
     interview_id: int
+    # Sessions are opened per DB operation, so no connection is held while the
+    # model is thinking or streaming.
+    session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal
+    # Intake snapshot (and its row version) this turn last read or wrote
+    intake: dict | None = None
+    intake_version: int | None = None
+
+
+# Bounded retries for compare-and-swap writes on MedicalInterview
+INTAKE_WRITE_RETRIES = 3
 
 
 class MyAgentContext(AgentContext):
     request_context: MyRequestContext
 
 
+# prompt path -> (mtime_ns, text)
+_prompt_cache: dict[Path, tuple[int, str]] = {}
+
+
 def load_prompt_md(relative_path: str) -> str:
+    """Return the prompt text, re-reading the file only when it has changed."""
     base_dir = Path(__file__).resolve().parent
-    prompt_path = base_dir / relative_path
-    return Path(prompt_path).read_text(encoding="utf-8-sig")
+    prompt_path = (base_dir / relative_path).resolve()
+    mtime_ns = prompt_path.stat().st_mtime_ns
+    cached = _prompt_cache.get(prompt_path)
+    if cached is None or cached[0] != mtime_ns:
+        cached = (mtime_ns, prompt_path.read_text(encoding="utf-8-sig"))
+        _prompt_cache[prompt_path] = cached
+    return cached[1]
+
+
+def prompt_instructions(relative_path: str):
+    """Agent instructions callable that picks up prompt file edits without a restart."""
+    load_prompt_md(relative_path)  # fail fast on a missing prompt file
+
+    def instructions(ctx, agent) -> str:
+        return load_prompt_md(relative_path)
+
+    return instructions
+
+
+def with_updated_at_sql(intake):
+    """SQL expression for `intake || {"updated_at": <now, UTC>}`."""
+    return intake.op("||", return_type=JSONB)(
+        func.jsonb_build_object(
+            "updated_at", func.to_jsonb(func.timezone("utc", func.now()))
+        )
+    )
+
+
+def merge_intake_sql(updates: dict):
+    """
+    SQL expression for `intake || updates || {"updated_at": <now, UTC>}`,
+    i.e. a server-side shallow merge of top-level form fields.
+    """
+    return with_updated_at_sql(
+        func.coalesce(MedicalInterview.intake, literal({}, JSONB)).op(
+            "||", return_type=JSONB
+        )(literal(updates, JSONB))
+    )
+
+
+def _intake_list_sql(list_name: str):
+    """`intake[list_name]` (empty when missing) and its elements as a table."""
+    current = func.coalesce(MedicalInterview.intake[list_name], literal([], JSONB))
+    elements = (
+        func.jsonb_array_elements(current)
+        .table_valued("value", with_ordinality="ordinality")
+        .render_derived()
+    )
+    return current, elements
+
+
+def _key_matches_sql(element, key_field: str, key: str):
+    return func.lower(element.op("->>", return_type=Text)(key_field)).is_not_distinct_from(
+        func.lower(literal(key))
+    )
+
+
+def intake_list_has_key_sql(list_name: str, key_field: str, key: str):
+    """SQL condition: some element of `intake[list_name]` has `key_field` == `key` (case-insensitive)."""
+    _, elements = _intake_list_sql(list_name)
+    return (
+        select(elements)
+        .where(_key_matches_sql(elements.c.value, key_field, key))
+        .exists()
+    )
+
+
+def edit_intake_list_sql(list_name: str, key_field: str, action: str, item: dict):
+    """
+    SQL expression applying one list operation to `intake[list_name]`:
+    - append: add `item` at the end
+    - update: merge `item` into the elements whose `key_field` matches (case-insensitive)
+    - remove: drop the elements whose `key_field` matches
+    """
+    current, elements = _intake_list_sql(list_name)
+    if action == "append":
+        new_list = current.op("||", return_type=JSONB)(
+            func.jsonb_build_array(literal(item, JSONB))
+        )
+    else:
+        element = elements.c.value
+        matches = _key_matches_sql(element, key_field, item[key_field])
+        rows = select(elements)
+        if action == "update":
+            element = case(
+                (matches, element.op("||", return_type=JSONB)(literal(item, JSONB))),
+                else_=element,
+            )
+        else:
+            rows = rows.where(matches.is_not(True))
+        new_list = func.coalesce(
+            rows.with_only_columns(
+                func.jsonb_agg(aggregate_order_by(element, elements.c.ordinality))
+            ).scalar_subquery(),
+            literal([], JSONB),
+        )
+    return with_updated_at_sql(
+        func.jsonb_set(
+            func.coalesce(MedicalInterview.intake, literal({}, JSONB)),
+            literal([list_name], ARRAY(Text)),
+            new_list,
+        )
+    )
 
 
 @function_tool
@@ -55,14 +182,29 @@ async def report_completion(ctx: RunContextWrapper[MyAgentContext]) -> None:
 
     # MedicalInterviewとAppointmentテーブルのステータス更新
     # (Update status of MedicalInterview and Appointment table)
-    db = ctx.context.request_context.db
-    interview_id = ctx.context.request_context.interview_id
-
-    db_medical_interview = db.get(MedicalInterview, interview_id)
-    db_medical_interview.status = "completed"
-    db_appointment = db.get(Appointment, db_medical_interview.appointment_id)
-    db_appointment.status = "Ready for medical examination"
-    db.commit()
+    request_context = ctx.context.request_context
+    interview_id = request_context.interview_id
+
+    # The version column makes this flush a compare-and-swap; retry on conflict.
+    async with request_context.session_factory() as db:
+        for attempt in range(INTAKE_WRITE_RETRIES):
+            try:
+                db_medical_interview = await db.get(
+                    MedicalInterview, interview_id, populate_existing=True
+                )
+                db_medical_interview.status = "completed"
+                db_appointment = await db.get(
+                    Appointment, db_medical_interview.appointment_id
+                )
+                db_appointment.status = "Ready for medical examination"
+                await db.commit()
+                break
+            except StaleDataError:
+                await db.rollback()
+                if attempt == INTAKE_WRITE_RETRIES - 1:
+                    raise
+    interview_cache.invalidate(interview_id)
+    intake_events.publish(interview_id, "status", {"status": "completed"})
 
     # ClientのonEffectフックへの連携 (Integration with the Client's onEffect hook)
     await ctx.context.stream(
@@ -90,21 +232,20 @@ async def report_completion(ctx: RunContextWrapper[MyAgentContext]) -> None:
     # Threadのクローズ (Close the thread)
     thread = ctx.context.thread
     store = ctx.context.store
-    request_context = ctx.context.request_context
     thread.status = ClosedStatus(reason="Medical interview completed.")
     await store.save_thread(thread, context=request_context)
 
 
 @function_tool
-def read_intake_form(ctx: RunContextWrapper[MyAgentContext]) -> dict:
+async def read_intake_form(ctx: RunContextWrapper[MyAgentContext]) -> dict:
     """
     This function retrieves the intake form from the database
     and returns its contents.
     """
-    db = ctx.context.request_context.db
-    interview_id = ctx.context.request_context.interview_id
+    request_context = ctx.context.request_context
 
-    obj = db.get(MedicalInterview, interview_id)
+    async with request_context.session_factory() as db:
+        obj = await db.get(MedicalInterview, request_context.interview_id)
 
     return obj.intake
 
@@ -124,44 +265,226 @@ async def update_intake_form(
     - Returns the updated JSON payload so the UI can refresh the right pane.
 
     Notes:
-    - List fields (symptoms/medications/allergies) are replaced as a whole if provided.
-      For "append one item" behavior, create separate append_* tools.
+    - List fields (symptoms/medications/allergies) are not part of `patch`.
+      Use edit_symptom / edit_medication / edit_allergy to change one item at a time.
+    - The write is a compare-and-swap on the row version. If someone else changed
+      the form since this turn read it, fields they did not touch are still applied
+      and fields they did change are returned under `conflicts` with current values.
     """
     await ctx.context.stream(ProgressUpdateEvent(text="Updating intake form in DB..."))
 
-    db = ctx.context.request_context.db
-    interview_id = ctx.context.request_context.interview_id
+    request_context = ctx.context.request_context
+    interview_id = request_context.interview_id
+
+    # 1) Keep only fields with a value (PATCH semantics). The strict tool schema
+    #    makes the model send every field, so omitted ones arrive as null and
+    #    must not wipe the stored value.
+    #    `patch` was already validated as IntakeFormPatch when the tool was called,
+    #    so only the patched sub-fields are checked, not the whole form.
+    updates = patch.model_dump(exclude_none=True, mode="json")
+
+    # 2) Merge into the JSONB column and set the timestamp in one UPDATE ... RETURNING,
+    #    guarded by the row version this turn last saw.
+    conflicts: dict = {}
+    obj = None
+    for _ in range(INTAKE_WRITE_RETRIES):
+        if not updates:
+            break
+        if request_context.intake_version is None:
+            if not await load_intake_snapshot(request_context):
+                return {"ok": False, "error": "MedicalInterview not found"}
+
+        async with request_context.session_factory() as db:
+            result = await db.execute(
+                update(MedicalInterview)
+                .where(
+                    MedicalInterview.id == interview_id,
+                    MedicalInterview.version == request_context.intake_version,
+                )
+                .values(
+                    intake=merge_intake_sql(updates),
+                    version=MedicalInterview.version + 1,
+                )
+                .returning(
+                    MedicalInterview.id,
+                    MedicalInterview.appointment_id,
+                    MedicalInterview.intake,
+                    MedicalInterview.version,
+                )
+            )
+            obj = result.one_or_none()
+            await db.commit()
+        if obj is not None:
+            interview_cache.invalidate(obj.id)
+            intake_events.publish_intake(
+                obj.id,
+                obj.version,
+                {k: obj.intake.get(k) for k in [*updates, "updated_at"]},
+            )
+            request_context.intake = obj.intake
+            request_context.intake_version = obj.version
+            break
+
+        # Lost the race: keep the fields the other writer did not change.
+        base = request_context.intake or {}
+        if not await load_intake_snapshot(request_context):
+            return {"ok": False, "error": "MedicalInterview not found"}
+        current = request_context.intake or {}
+        for k in list(updates):
+            if current.get(k) != base.get(k) and current.get(k) != updates[k]:
+                conflicts[k] = current.get(k)
+                updates.pop(k)
+        if not updates:
+            break
+    else:
+        return {"ok": False, "error": "Intake form is being updated concurrently"}
 
-    obj = db.get(MedicalInterview, interview_id)
     if obj is None:
-        return {"ok": False, "error": "MedicalInterview not found"}
+        # Nothing left to write (an all-null patch, or every field conflicted):
+        # return the current form without bumping the version, invalidating
+        # the cache or notifying clients.
+        async with request_context.session_factory() as db:
+            obj = (
+                await db.execute(
+                    select(
+                        MedicalInterview.id,
+                        MedicalInterview.appointment_id,
+                        MedicalInterview.intake,
+                    ).where(MedicalInterview.id == interview_id)
+                )
+            ).one_or_none()
+        if obj is None:
+            return {"ok": False, "error": "MedicalInterview not found"}
 
-    # 1) JSONB (dict) -> Pydantic. If empty, initialize to defaults.
-    current_form = IntakeForm.model_validate(obj.intake or {})
+    await ctx.context.stream(ProgressUpdateEvent(text="Update complete: Intake form"))
 
-    # 2) Keep only fields actually provided by the model (PATCH semantics).
-    updates = patch.model_dump(exclude_unset=True, mode="json")
+    response = {
+        "ok": True,
+        "medical_interview": {
+            "id": obj.id,
+            "appointment_id": obj.appointment_id,
+            "form": obj.intake,
+        },
+    }
+    if conflicts:
+        response["conflicts"] = conflicts
+    return response
 
-    # Optional safety: ignore explicit null for list fields (treat as "no update")
-    for k in ("symptoms", "medications", "allergies"):
-        if k in updates and updates[k] is None:
-            updates.pop(k)
 
-    # 3) Merge and set timestamp.
-    merged = current_form.model_dump(mode="json")
-    merged.update(updates)
-    merged["updated_at"] = datetime.utcnow().isoformat()
+@function_tool
+async def edit_symptom(
+    ctx: RunContextWrapper[MyAgentContext], action: ListAction, symptom: Symptom
+) -> dict:
+    """
+    Edits one entry of the intake form's symptom list, matched by `name`.
 
-    # Optional safety: normalize list fields if they somehow become null
-    for k in ("symptoms", "medications", "allergies"):
-        if merged.get(k) is None:
-            merged[k] = []
+    Args:
+    - action: "append" adds a symptom whose name is not listed yet, "update" overwrites
+      the non-null fields of the symptom with the same name, "remove" deletes it
+      (only `name` is needed).
+    - symptom: Symptom
+    """
+    return await edit_intake_list(ctx, "symptoms", "name", action, symptom)
+
+
+@function_tool
+async def edit_medication(
+    ctx: RunContextWrapper[MyAgentContext], action: ListAction, medication: Medication
+) -> dict:
+    """
+    Edits one entry of the intake form's medication list, matched by `name`.
 
-    # 4) Validate BEFORE DB write, then store dict into JSONB.
-    obj.intake = IntakeForm.model_validate(merged).model_dump(mode="json")
+    Args:
+    - action: "append" adds a medication whose name is not listed yet, "update"
+      overwrites the non-null fields of the medication with the same name, "remove"
+      deletes it (only `name` is needed).
+    - medication: Medication
+    """
+    return await edit_intake_list(ctx, "medications", "name", action, medication)
 
-    db.commit()
-    db.refresh(obj)
+
+@function_tool
+async def edit_allergy(
+    ctx: RunContextWrapper[MyAgentContext], action: ListAction, allergy: Allergy
+) -> dict:
+    """
+    Edits one entry of the intake form's allergy list, matched by `allergen`.
+
+    Args:
+    - action: "append" adds an allergy whose allergen is not listed yet, "update"
+      overwrites the non-null fields of the allergy with the same allergen, "remove"
+      deletes it (only `allergen` is needed). `severity` is always written on
+      update, so pass the current value to keep it.
+    - allergy: Allergy
+    """
+    return await edit_intake_list(ctx, "allergies", "allergen", action, allergy)
+
+
+async def edit_intake_list(
+    ctx: RunContextWrapper[MyAgentContext],
+    list_name: str,
+    key_field: str,
+    action: str,
+    item: Symptom | Medication | Allergy,
+) -> dict:
+    await ctx.context.stream(ProgressUpdateEvent(text="Updating intake form in DB..."))
+
+    request_context = ctx.context.request_context
+
+    # Strict tool schemas make every field present, so null means "not provided".
+    values = item.model_dump(mode="json", exclude_none=True)
+    values[key_field] = getattr(item, key_field)
+
+    # update / remove need an entry with this key and append needs none, checked
+    # in the WHERE clause so a no-op never writes, bumps the version or publishes.
+    has_key = intake_list_has_key_sql(list_name, key_field, values[key_field])
+    key_condition = ~has_key if action == "append" else has_key
+
+    # Array ops run on the current row server-side, so no version check is needed;
+    # the version is still bumped so compare-and-swap writers see the change.
+    async with request_context.session_factory() as db:
+        result = await db.execute(
+            update(MedicalInterview)
+            .where(MedicalInterview.id == request_context.interview_id, key_condition)
+            .values(
+                intake=edit_intake_list_sql(list_name, key_field, action, values),
+                version=MedicalInterview.version + 1,
+            )
+            .returning(
+                MedicalInterview.id,
+                MedicalInterview.appointment_id,
+                MedicalInterview.intake,
+                MedicalInterview.version,
+            )
+        )
+        obj = result.one_or_none()
+        await db.commit()
+        if obj is None:
+            exists = await db.scalar(
+                select(MedicalInterview.id).where(
+                    MedicalInterview.id == request_context.interview_id
+                )
+            )
+    if obj is None:
+        if exists is None:
+            return {"ok": False, "error": "MedicalInterview not found"}
+        if action == "append":
+            return {
+                "ok": False,
+                "error": f"A {list_name} entry with this {key_field} already exists; "
+                "use update",
+            }
+        return {"ok": False, "error": f"No {list_name} entry matches {key_field}"}
+    interview_cache.invalidate(obj.id)
+    request_context.intake = obj.intake
+    request_context.intake_version = obj.version
+
+    entries = obj.intake.get(list_name) or []
+    intake_events.publish_intake(
+        obj.id,
+        obj.version,
+        {list_name: entries, "updated_at": obj.intake.get("updated_at")},
+    )
 
     await ctx.context.stream(ProgressUpdateEvent(text="Update complete: Intake form"))
 
@@ -170,11 +493,27 @@ async def update_intake_form(
         "medical_interview": {
             "id": obj.id,
             "appointment_id": obj.appointment_id,
-            "form": obj.intake,
+            list_name: entries,
         },
     }
 
 
+async def load_intake_snapshot(request_context: MyRequestContext) -> bool:
+    """Refresh the context's intake snapshot and version. False if the row is gone."""
+    async with request_context.session_factory() as db:
+        row = (
+            await db.execute(
+                select(MedicalInterview.intake, MedicalInterview.version).where(
+                    MedicalInterview.id == request_context.interview_id
+                )
+            )
+        ).one_or_none()
+    if row is None:
+        return False
+    request_context.intake, request_context.intake_version = row.intake, row.version
+    return True
+
+
 # -----------------------------
 # The following tools are old. These are not used now.
 # -----------------------------
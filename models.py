@@ -1,6 +1,15 @@
 import enum
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Text,
+    DateTime,
+    ForeignKey,
+    Enum,
+    Index,
+)
 from sqlalchemy.orm import declarative_base, relationship, Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import JSONB
 
@@ -48,6 +57,11 @@ class Appointment(Base):
         "MedicalInterview", back_populates="appointment", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index("ix_appointments_date", "date"),
+        Index("ix_appointments_patient_id", "patient_id"),
+    )
+
 
 class InterviewStatus(str, enum.Enum):
     DRAFT = "draft"
@@ -70,4 +84,41 @@ class MedicalInterview(Base):
     initial_consult = Column(Text, nullable=True)
     intake = Column(JSONB, nullable=True, default={})
     created_at = Column(DateTime, nullable=True)
+    # Row version for optimistic concurrency (compare-and-swap on UPDATE)
+    version = Column(Integer, nullable=False, server_default="1")
     appointment = relationship("Appointment", back_populates="medical_interviews")
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+# Latest interview per appointment: WHERE appointment_id = ? ORDER BY created_at DESC
+Index(
+    "ix_medical_interviews_appointment_id_created_at",
+    MedicalInterview.appointment_id,
+    MedicalInterview.created_at.desc(),
+)
+Index("ix_medical_interviews_status", MedicalInterview.status)
+
+
+# ChatKit threads and thread items (used by PostgresChatKitStore)
+class ChatThread(Base):
+    __tablename__ = "threads"
+    id = Column(String, primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+    data = Column(JSONB, nullable=False)
+
+    __table_args__ = (Index("ix_threads_created_at_id", "created_at", "id"),)
+
+
+class ChatThreadItem(Base):
+    __tablename__ = "thread_items"
+    thread_id = Column(
+        String, ForeignKey("threads.id", ondelete="CASCADE"), primary_key=True
+    )
+    id = Column(String, primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+    data = Column(JSONB, nullable=False)
+
+    __table_args__ = (
+        Index("ix_thread_items_thread_id_created_at_id", "thread_id", "created_at", "id"),
+    )
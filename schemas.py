@@ -1,6 +1,21 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Annotated
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import AfterValidator, BaseModel, Field, ConfigDict
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """
+    タイムスタンプ列は timezone なし (UTC) なので、aware な値は UTC に変換して tzinfo を外す
+    (Timestamp columns are naive UTC; asyncpg rejects aware values for them)
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# Query parameter type for filters on naive timestamp columns
+NaiveUTCDatetime = Annotated[datetime, AfterValidator(to_naive_utc)]
 
 
 class CreateAppointmentSchema(BaseModel):
@@ -19,6 +34,12 @@ class ReadAppointmentSchema(BaseModel):
     date: datetime
 
 
+class ReadAppointmentPage(BaseModel):
+    items: list[ReadAppointmentSchema]
+    # Opaque cursor for the next page; None when this is the last page.
+    next_cursor: str | None = None
+
+
 class UpdateAppointmentSchema(BaseModel):
     status: str | None = None
     date: datetime | None = None
@@ -29,6 +50,18 @@ class CreateMedicalInterview(BaseModel):
     initial_consult: str = Field(None)
 
 
+class BulkCreateMedicalInterviews(BaseModel):
+    appointment_ids: list[int] = Field(..., min_length=1, max_length=1000)
+    initial_consult: str | None = None
+
+
+class BulkCreateMedicalInterviewResult(BaseModel):
+    appointment_id: int
+    ok: bool
+    medical_interview_id: int | None = None
+    error: str | None = None
+
+
 class UpdateMedicalInterview(BaseModel):
     initial_consult: str | None = None
     initial_findings: str | None = None
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="session")
+def postgres_url():
+    """URL of a throwaway PostgreSQL container; skips when Docker is unavailable."""
+    postgres = pytest.importorskip("testcontainers.postgres")
+    container = postgres.PostgresContainer("postgres:16-alpine", driver="psycopg2")
+    try:
+        container.start()
+    except Exception as exc:
+        pytest.skip(f"PostgreSQL container unavailable: {exc}")
+    try:
+        yield container.get_connection_url()
+    finally:
+        container.stop()
+
+
+@pytest.fixture(scope="session")
+def seeded_engine(postgres_url):
+    """Migrated (alembic upgrade head), seeded and ANALYZEd database."""
+    from alembic import command
+    from alembic.config import Config
+
+    import inject_dummy_data
+    from config import settings
+
+    # migrations/env.py reads the URL from settings
+    original_url = settings.DATABASE_URL
+    settings.DATABASE_URL = postgres_url
+    try:
+        command.upgrade(Config(str(ROOT / "alembic.ini")), "head")
+    finally:
+        settings.DATABASE_URL = original_url
+
+    engine = create_engine(postgres_url)
+    # Drafts are the in-progress minority, as in production.
+    inject_dummy_data.seed(scale=100, seed=42, completed_ratio=0.99, bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    yield engine
+    engine.dispose()
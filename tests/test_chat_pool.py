@@ -0,0 +1,54 @@
+import asyncio
+
+# Imported first: sets TRACING_MODE=off before main configures tracing.
+import chatkit_load_test
+
+import db
+from db import AsyncSessionLocal, PoolStats, TimedAsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine
+
+
+POOL_SIZE = 10
+SESSIONS = 200
+# Each model call waits this long. A stream that held a connection across the
+# run would keep it for several of these, far past POOL_TIMEOUT_SECONDS.
+FIRST_TOKEN_DELAY = 2.0
+POOL_TIMEOUT_SECONDS = 1
+
+
+def test_200_chat_streams_share_10_connections(seeded_engine, monkeypatch):
+    engine = create_async_engine(
+        seeded_engine.url.set(drivername="postgresql+asyncpg"),
+        poolclass=TimedAsyncAdaptedQueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=POOL_TIMEOUT_SECONDS,
+    )
+    monkeypatch.setattr(db, "async_engine", engine)
+    monkeypatch.setattr(db, "pool_stats", PoolStats())
+    original_bind = AsyncSessionLocal.kw["bind"]
+    AsyncSessionLocal.configure(bind=engine)
+
+    async def run():
+        try:
+            return await chatkit_load_test.run_load_test(
+                SESSIONS,
+                turns=2,
+                tokens_per_second=500,
+                first_token_delay=FIRST_TOKEN_DELAY,
+            )
+        finally:
+            await engine.dispose()
+
+    try:
+        metrics = asyncio.run(run())
+    finally:
+        AsyncSessionLocal.configure(bind=original_bind)
+
+    assert metrics.errors == 0
+    assert metrics.turns == SESSIONS * 2
+    # Most streams were open at once while at most POOL_SIZE connections were
+    # in use, and no checkout came close to waiting for the pool timeout.
+    assert metrics.max_in_flight >= 5 * POOL_SIZE
+    assert metrics.max_checked_out <= POOL_SIZE
+    assert metrics.max_checkout_wait_ms < POOL_TIMEOUT_SECONDS * 1000 / 2
@@ -0,0 +1,198 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from chatkit.store import NotFoundError
+from chatkit.types import (
+    ActiveStatus,
+    AssistantMessageContent,
+    AssistantMessageItem,
+    ClosedStatus,
+    Page,
+    ThreadMetadata,
+)
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import intake_chat.context
+from intake_chat.context import ConversationContextCache
+from intake_chat.metrics import (
+    CHAT_CONTEXT_CACHE_EVICTIONS,
+    CHAT_CONTEXT_CACHE_LOOKUPS,
+    registry,
+)
+from intake_chat.store import PostgresChatKitStore
+
+
+class FakeStore:
+    """Thread items in memory, paged like PostgresChatKitStore.load_thread_items."""
+
+    def __init__(self):
+        self.items: dict[str, list] = {}
+        self.added: dict[str, int] = {}
+
+    def add(self, thread_id: str, text: str) -> None:
+        # Ids are never reused, like ChatKit's generated item ids
+        number = self.added.get(thread_id, 0)
+        self.added[thread_id] = number + 1
+        self.items.setdefault(thread_id, []).append(
+            SimpleNamespace(id=f"{thread_id}-{number}", text=text)
+        )
+
+    async def load_thread_items(self, thread_id, after, limit, order, context):
+        items = self.items.get(thread_id, [])
+        if order == "desc":
+            items = items[::-1]
+        start = 0
+        if after is not None:
+            ids = [item.id for item in items]
+            if after not in ids:
+                raise NotFoundError(f"Thread item {after} not found")
+            start = ids.index(after) + 1
+        data = items[start : start + limit]
+        has_more = start + limit < len(items)
+        return Page(data=data, has_more=has_more, after=data[-1].id if has_more else None)
+
+
+class FakeConverter:
+    async def to_agent_input(self, item):
+        return [{"role": "user", "content": item.text}]
+
+
+def make_cache(**kwargs) -> ConversationContextCache:
+    return ConversationContextCache(
+        token_budget=10_000, converter=FakeConverter(), **kwargs
+    )
+
+
+def build(cache, store, thread_id):
+    return asyncio.run(cache.build(store, thread_id, context=None))
+
+
+def test_lookups_count_hits_and_misses():
+    cache, store = make_cache(), FakeStore()
+    store.add("t1", "頭痛があります。")
+    hits = CHAT_CONTEXT_CACHE_LOOKUPS.value(result="hit")
+    misses = CHAT_CONTEXT_CACHE_LOOKUPS.value(result="miss")
+
+    build(cache, store, "t1")
+    store.add("t1", "昨日からです。")
+    history = build(cache, store, "t1")
+
+    assert [item["content"] for item in history] == ["頭痛があります。", "昨日からです。"]
+    assert CHAT_CONTEXT_CACHE_LOOKUPS.value(result="miss") == misses + 1
+    assert CHAT_CONTEXT_CACHE_LOOKUPS.value(result="hit") == hits + 1
+    assert 'chat_context_cache_lookups_total{result="hit"}' in registry.render()
+
+
+def test_deleted_cursor_item_rebuilds_the_thread():
+    cache, store = make_cache(), FakeStore()
+    store.add("t1", "頭痛があります。")
+    store.add("t1", "いつからですか？")
+    build(cache, store, "t1")
+
+    # Another worker retries the last item: deleted here without notifying the cache
+    store.items["t1"].pop()
+    store.add("t1", "いつからですか？（再生成）")
+    history = build(cache, store, "t1")
+
+    assert [item["content"] for item in history] == [
+        "頭痛があります。",
+        "いつからですか？（再生成）",
+    ]
+
+
+def test_least_recently_used_thread_is_evicted():
+    cache, store = make_cache(max_threads=2), FakeStore()
+    for thread_id in ("t1", "t2", "t3"):
+        store.add(thread_id, "こんにちは")
+    evictions = CHAT_CONTEXT_CACHE_EVICTIONS.value(reason="lru")
+
+    build(cache, store, "t1")
+    build(cache, store, "t2")
+    build(cache, store, "t1")  # t2 is now the least recently used
+    build(cache, store, "t3")
+
+    assert len(cache) == 2
+    assert cache.window_start_id("t2") is None
+    assert cache.window_start_id("t1") == "t1-0"
+    assert CHAT_CONTEXT_CACHE_EVICTIONS.value(reason="lru") == evictions + 1
+
+
+def test_closed_thread_is_evicted_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(intake_chat.context.time, "monotonic", lambda: now[0])
+    cache, store = make_cache(closed_thread_ttl_seconds=60), FakeStore()
+    store.add("t1", "以上です。")
+    store.add("t2", "こんにちは")
+    evictions = CHAT_CONTEXT_CACHE_EVICTIONS.value(reason="closed_ttl")
+
+    build(cache, store, "t1")
+    cache.mark_closed("t1")
+    now[0] += 30
+    build(cache, store, "t2")
+    assert cache.window_start_id("t1") == "t1-0"
+
+    now[0] += 31
+    build(cache, store, "t2")
+    assert cache.window_start_id("t1") is None
+    assert len(cache) == 1
+    assert CHAT_CONTEXT_CACHE_EVICTIONS.value(reason="closed_ttl") == evictions + 1
+
+
+class NullSession:
+    """AsyncSession stand-in that accepts writes and does nothing."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        pass
+
+    async def commit(self):
+        pass
+
+
+def test_store_reports_closed_threads():
+    store = PostgresChatKitStore(session_factory=NullSession)
+    closed = []
+    store.add_close_listener(closed.append)
+
+    for status in (ActiveStatus(), ClosedStatus(reason="Medical interview completed.")):
+        thread = ThreadMetadata(id="t1", created_at=datetime.now(), status=status)
+        asyncio.run(store.save_thread(thread, context=None))
+
+    assert closed == ["t1"]
+
+
+def test_postgres_store_rejects_unknown_cursor(seeded_engine):
+    engine = create_async_engine(seeded_engine.url.set(drivername="postgresql+asyncpg"))
+    store = PostgresChatKitStore(session_factory=async_sessionmaker(engine))
+    thread = ThreadMetadata(id="thr_cursor", created_at=datetime.now())
+    item = AssistantMessageItem(
+        id="msg_1",
+        thread_id=thread.id,
+        created_at=datetime.now(),
+        content=[AssistantMessageContent(text="こんにちは")],
+    )
+
+    async def run():
+        try:
+            await store.save_thread(thread, context=None)
+            await store.add_thread_item(thread.id, item, context=None)
+            page = await store.load_thread_items(
+                thread.id, after=None, limit=10, order="asc", context=None
+            )
+            assert [loaded.id for loaded in page.data] == ["msg_1"]
+            await store.delete_thread_item(thread.id, item.id, context=None)
+            with pytest.raises(NotFoundError):
+                await store.load_thread_items(
+                    thread.id, after=item.id, limit=10, order="asc", context=None
+                )
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
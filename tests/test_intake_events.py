@@ -0,0 +1,41 @@
+import asyncio
+
+from intake_events import IntakeChangeBroker
+from intake_chat.streaming import KEEPALIVE, stream_with_heartbeat
+
+
+def test_full_queue_is_replaced_by_resync():
+    broker = IntakeChangeBroker(queue_size=2)
+    with broker.subscribe(1) as queue:
+        for version in range(4):
+            broker.publish_intake(1, version, {"visit_reason": f"v{version}"})
+        events = [queue.get_nowait() for _ in range(queue.qsize())]
+
+    assert events == [
+        ("resync", {}),
+        ("intake", {"version": 3, "changes": {"visit_reason": "v3"}}),
+    ]
+
+
+def test_stream_relays_events_with_keepalive_and_unsubscribes():
+    broker = IntakeChangeBroker()
+
+    async def is_disconnected():
+        return False
+
+    async def run():
+        frames = stream_with_heartbeat(
+            broker.stream(7), is_disconnected, heartbeat_seconds=0.05
+        )
+        assert await anext(frames) == KEEPALIVE
+        broker.publish(7, "status", {"status": "completed"})
+        frame = await anext(frames)
+        while frame == KEEPALIVE:
+            frame = await anext(frames)
+        await frames.aclose()
+        return frame
+
+    frame = asyncio.run(run())
+
+    assert frame == b'event: status\ndata: {"status":"completed"}\n\n'
+    assert 7 not in broker._subscribers
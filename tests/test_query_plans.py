@@ -0,0 +1,62 @@
+from sqlalchemy import select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from main import appointments_page_query, latest_interview_query
+from intake_export import export_query
+from models import Appointment, InterviewStatus, MedicalInterview
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def index_names(plan: dict) -> set[str]:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= index_names(child)
+    return names
+
+
+def plan_indexes(engine, statement) -> set[str]:
+    with engine.connect() as conn:
+        [explain] = conn.execute(Explain(statement)).scalar_one()
+    return index_names(explain["Plan"])
+
+
+def test_latest_interview_uses_appointment_created_at_index(seeded_engine):
+    with seeded_engine.connect() as conn:
+        appointment_id = conn.scalar(select(MedicalInterview.appointment_id).limit(1))
+
+    assert "ix_medical_interviews_appointment_id_created_at" in plan_indexes(
+        seeded_engine, latest_interview_query(appointment_id)
+    )
+
+
+def test_appointment_listing_uses_date_index(seeded_engine):
+    assert "ix_appointments_date" in plan_indexes(
+        seeded_engine, appointments_page_query(50)
+    )
+
+
+def test_appointments_by_patient_use_patient_index(seeded_engine):
+    with seeded_engine.connect() as conn:
+        patient_id = conn.scalar(select(Appointment.patient_id).limit(1))
+
+    assert "ix_appointments_patient_id" in plan_indexes(
+        seeded_engine, appointments_page_query(50, patient_id=patient_id)
+    )
+
+
+def test_interview_status_filter_uses_status_index(seeded_engine):
+    assert "ix_medical_interviews_status" in plan_indexes(
+        seeded_engine, export_query(status=InterviewStatus.DRAFT)
+    )